@@ -1,14 +1,10 @@
-from utils.data import get_data, get_prefix_dict
-from utils.trie import build_all_automaton, trie_pipeline
+from utils.trie import trie_pipeline
 from utils.fuzz import fuzz_pipeline
 from utils.input import preprocess_input, select_candidate_by_order_administrative, select_candidate_by_order_administrative_v2
 import time
 import sys
 sys.path.append("test")
-DATA = get_data()
-PREFIX = get_prefix_dict()
-
-AUTOMATON = build_all_automaton(DATA, PREFIX)
+from pipeline import AUTOMATON
 
 import json
 
@@ -1,20 +1,15 @@
 from rapidfuzz import fuzz
 import Levenshtein
-from utils.data import get_data, get_prefix_dict
 from utils.decorators import track_time_ns
 from utils.fuzz import fuzz_pipeline_v2
 from utils.preprocess import to_normalized
-from utils.trie import build_all_automaton
 # from utils.input import preprocess_input
 from utils.input_v2 import preprocess_input, test_pattern
 from input_test.export_sample import export_sample, export_diff
-from utils.bktree import bktree_find_v1, build_bk_trees, bktree_find, fuzzy_prefix, prefix_helper
+from utils.bktree import bktree_find_v1, bktree_find, fuzzy_prefix, prefix_helper
 from utils.trie_pipeline_v2 import PREFIX_DICT, bktree_spelling_check
 
-DATA = get_data()
-PREFIX = get_prefix_dict()
-AUTOMATON = build_all_automaton(DATA, PREFIX)
-BKTREE = build_bk_trees(DATA, PREFIX["full"]["normalized"], to_normalized)
+from pipeline import DATA, PREFIX, AUTOMATON, BKTREE
 
 test_pass = [
     ("T.T.H", "thừa thiên huế"),
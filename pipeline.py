@@ -1,14 +1,13 @@
-from utils.bktree import build_bk_trees
-from utils.data import get_data, get_prefix_dict
-from utils.trie import build_all_automaton
-from utils.input import preprocess_input
-from utils.preprocess import to_normalized
-from utils.trie_pipeline_v2 import full_pipeline
+from utils.index import AddressIndex
 
-DATA = get_data()
-PREFIX = get_prefix_dict()
-AUTOMATON = build_all_automaton(DATA, PREFIX)
-BKTREE = build_bk_trees(DATA, PREFIX["full"]["normalized"], to_normalized)
+INDEX = AddressIndex()
+
+def __getattr__(name: str):
+    # DATA, PREFIX, AUTOMATON, BKTREE chỉ được load khi có người dùng tới
+    attributes = {"DATA": "data", "PREFIX": "prefix", "AUTOMATON": "automaton", "BKTREE": "bktree"}
+    if name in attributes:
+        return getattr(INDEX, attributes[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def process(input : str):
-    return full_pipeline(preprocess_input(input), AUTOMATON, BKTREE)
\ No newline at end of file
+    return INDEX.process(input)
@@ -1,11 +1,8 @@
 from math import exp
-from utils.data import get_data, get_prefix_dict    
+from pipeline import AUTOMATON, BKTREE
 from utils.input_v2 import preprocess_input
-from utils.preprocess import to_normalized
-from utils.trie import build_all_automaton
 from utils.trie_pipeline_v2 import check_automaton, full_pipeline, spelling_detect, window_slide
 from utils.spelling_error_pipeline import extract_address_components, find_match, create_list
-from utils.bktree import build_bk_trees
 import time
 import json
 
@@ -16,10 +13,6 @@ expected_province = [case["result"]["province"] for case in tests]
 expected_district = [case["result"]["district"] for case in tests]
 expected_ward = [case["result"]["ward"] for case in tests]
 
-DATA = get_data()
-PREFIX = get_prefix_dict()
-AUTOMATON = build_all_automaton(DATA, PREFIX)
-BKTREE = build_bk_trees(DATA, PREFIX["full"]["normalized"], to_normalized)
 tests = [
     ("T.T.H", "thừa thiên huế"),
     ("P4 T.Ph9ốĐông Hà", ""),
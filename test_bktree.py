@@ -0,0 +1,109 @@
+import pickle
+
+import Levenshtein
+import pytest
+
+from utils.bktree import BKTree, build_bk_trees
+from utils.data import get_data
+from utils.preprocess import to_normalized
+
+DATA = get_data()
+TREES = build_bk_trees({"districts": DATA["districts"]}, [], to_normalized)
+QUERIES = ["cau giay", "tan binh", "quan 1", "bac tu liem", "thu duc", "hai ba trung", "xyz", ""]
+
+def linear_search(words, query, max_distance):
+    # quét toàn bộ: tập kết quả đúng của search
+    return sorted((word, Levenshtein.distance(word, query)) for word in words if Levenshtein.distance(word, query) <= max_distance)
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2, 3])
+def test_search_matches_linear_scan(max_distance):
+    tree = TREES["districts"]
+    for query in QUERIES:
+        found = sorted((word, distance) for word, _, distance in tree.search(query, max_distance=max_distance))
+        assert found == linear_search(tree.words, query, max_distance)
+
+def test_compact_keeps_results_and_allows_insert():
+    words = ["ba dinh", "ba vi", "dong da", "cau giay", "tay ho", "hoang mai", "long bien"]
+    tree = BKTree("districts")
+    for word in words:
+        tree.insert(word, word.title())
+    before = tree.search("ba dinh", max_distance=3)
+
+    tree.compact()
+    assert tree.search("ba dinh", max_distance=3) == before
+    assert len(tree.edge_start) == len(tree.words) + 1
+
+    # insert sau compact rồi search lại
+    tree.insert("ba dinhh", "Ba Dinhh")
+    tree.insert("ba dinh", "Ba Dinh")
+    assert tree.size == len(words) + 1
+    assert ("ba dinhh", "Ba Dinhh", 1) in tree.search("ba dinh", max_distance=1)
+
+def test_compacted_tree_pickles():
+    tree = TREES["districts"]
+    loaded = pickle.loads(pickle.dumps(tree))
+    for query in QUERIES:
+        assert loaded.search(query, max_distance=2) == tree.search(query, max_distance=2)
+
+def repeated_dynamic_search(tree, phrase, preprocess=None, max_expand=5, distance_ratio_cutoff=0.25):
+    # dynamic_phrase_search cũ: gọi search lại với max_distance + 1 cho tới khi đạt ngưỡng
+    phrase = preprocess(phrase) if preprocess else phrase.lower()
+    length = len(phrase)
+    results, current_distance = [], max(2, int(length * 0.08))
+    while current_distance <= max_expand and current_distance / length <= distance_ratio_cutoff * 1.5:
+        results = tree.search(phrase, preprocess, max_distance=current_distance)
+        if results and min(r[-1] for r in results) / max(1, length) <= distance_ratio_cutoff:
+            break
+        current_distance += 1
+    return sorted(results, key=lambda x: (x[-1], -len(x[-2])))
+
+def test_search_thresholds_matches_search():
+    tree = TREES["districts"]
+    for query in QUERIES:
+        swept = list(tree.search_thresholds(query, [0, 1, 2, 4]))
+        assert swept == [tree.search(query, max_distance=k) for k in (0, 1, 2, 4)]
+
+def test_dynamic_phrase_search_matches_repeated_search():
+    tree = TREES["districts"]
+    phrases = [query for query in QUERIES if query] + ["quan cau giay ha noi", "thanh pho thu duc", "huyen bac tu liem"]
+    for phrase in phrases:
+        for preprocess in (None, to_normalized):
+            assert tree.dynamic_phrase_search(phrase, preprocess) == repeated_dynamic_search(tree, phrase, preprocess)
+
+@pytest.mark.parametrize("max_distance", [1, 2, 3])
+def test_search_topk_matches_sorted_search(max_distance):
+    tree = TREES["districts"]
+    order = {word: node for node, word in enumerate(tree.words)}
+    for query in QUERIES:
+        ranked = sorted(tree.search(query, max_distance=max_distance), key=lambda x: (x[2], order[x[0]]))
+        for k in (1, 3, 10):
+            assert tree.search_topk(query, k, max_distance) == ranked[:k]
+        nearest = [x for x in ranked if x[2] == ranked[0][2]]
+        assert tree.search_topk(query, 1, max_distance, ties=True) == nearest
+
+def test_nearest_phrase_search_is_best_group_of_dynamic_search():
+    tree = TREES["districts"]
+    for phrase in [query for query in QUERIES if query] + ["quan cau giay ha noi", "thanh pho thu duc"]:
+        for preprocess in (None, to_normalized):
+            found = tree.dynamic_phrase_search(phrase, preprocess)
+            best_group = [x for x in found if x[-1] == found[0][-1]]
+            assert tree.nearest_phrase_search(phrase, preprocess) == best_group
+
+def test_address_matcher_search_topk():
+    from utils.address_matcher import build_bk_trees as build_matcher_trees
+
+    tree = build_matcher_trees({"districts": TREES["districts"].words})["districts"]
+    for query in QUERIES:
+        for k in (1, 3):
+            assert tree.search_topk(query, k, 2) == tree.search(query, 2)[:k]
+
+def test_bktree_find_batch_matches_bktree_find():
+    pytest.importorskip("numpy")
+    from utils.bktree import bktree_find, bktree_find_batch
+    from utils.trie_pipeline_v3 import PREFIX_DICT
+
+    tree = TREES["districts"]
+    texts = ["quan cau giay ha noi", "thanh pho thu duc", "p tan binh q tan binh", "xyz", ""]
+    expected = [bktree_find(text, tree, PREFIX_DICT, to_normalized, "districts") for text in texts]
+    for workers in (1, 2):
+        assert bktree_find_batch(texts, tree, PREFIX_DICT, to_normalized, "districts", workers) == expected
@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+
+import pytest
+
+from utils.cache import MISSING, ResultCache, SQLiteResultCache
+from utils.index import AddressIndex
+
+def test_result_cache_lru_eviction():
+    cache = ResultCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" mới được dùng -> "b" bị loại trước
+    cache.put("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2, "maxsize": 2, "hit_rate": 0.75}
+
+def test_index_result_cache():
+    index = AddressIndex(cache_size=8)
+    uncached = AddressIndex()
+
+    inputs = ["Xã Quảng Thành, TP Thanh Hoá, Thanh Hoá", "xã quảng thành,  tp thanh hoá, thanh hoá"]
+    results = [index.process(input) for input in inputs]
+
+    # hai input giống nhau sau preprocess_input -> một entry
+    assert results == [uncached.process(input) for input in inputs]
+    assert index.cache_stats()["hits"] == 1 and index.cache_stats()["size"] == 1
+    assert uncached.cache_stats() is None
+
+def test_sqlite_result_cache(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    store = SQLiteResultCache(path)
+    store.put(("v1", "quan 1"), ("Hồ Chí Minh", "Quận 1", None))
+    store.put(("v2", "quan 1"), ("Hồ Chí Minh", None, None))
+    store.close()
+
+    # một instance khác (process khác / sau khi restart) đọc lại được
+    reopened = SQLiteResultCache(path)
+    assert reopened.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert reopened.get(("v1", "quan 1")) == ("Hồ Chí Minh", "Quận 1", None)
+    assert reopened.get(("v1", "quan 2")) is MISSING
+    assert reopened.prune("v2") == 1
+    assert reopened.get(("v1", "quan 1")) is MISSING and len(reopened) == 1
+    assert reopened.stats() == {"hits": 1, "misses": 2, "writes": 0, "hit_rate": 1 / 3}
+
+def test_sqlite_result_cache_close_all_threads(tmp_path):
+    store = SQLiteResultCache(str(tmp_path / "results.sqlite"))
+    connections = []
+    worker = threading.Thread(target=lambda: connections.append(store.connection))
+    worker.start()
+    worker.join()
+    connections.append(store.connection)
+    store.close()
+
+    # connection của thread khác cũng bị đóng
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+    # dùng lại sau close() -> mở connection mới
+    store.put(("v1", "quan 1"), ("Hồ Chí Minh", "Quận 1", None))
+    assert store.get(("v1", "quan 1")) == ("Hồ Chí Minh", "Quận 1", None)
+    store.close()
+
+def test_index_persistent_store(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    input = "Xã Quảng Thành, TP Thanh Hoá, Thanh Hoá"
+    expected = AddressIndex(cache_path=path).process(input)
+
+    restarted = AddressIndex(cache_path=path)
+    assert restarted.process(input) == expected
+    assert restarted.store_stats()["hits"] == 1
+    # index chỉ có cấp tỉnh cho kết quả khác -> không dùng chung entry
+    provinces = AddressIndex(levels=("provinces",), cache_path=path)
+    assert provinces.process(input) == ("Thanh Hóa", None, None)
+    assert provinces.store_stats()["hits"] == 0
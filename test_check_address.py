@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from pipeline import AUTOMATON
+from utils.input_v2 import preprocess_input
+from utils.preprocess import to_diacritics
+from utils.preprocess import to_normalized_no_comma_deleted as to_normalized
+from utils.trie_pipeline_v2 import check_address, check_automaton
+
+with open("test/latest_test.json", "r", encoding="utf-8") as f:
+    tests = json.load(f)
+
+def full_scan_check_address(processed_input, automaton, address_type, comp):
+    # check_address trước khi giới hạn cửa sổ quét: quét cả input rồi lọc theo comp
+    address_dict = check_automaton(automaton, processed_input, address_type)
+    if address_dict:
+        best_key = max((k for k in address_dict.keys() if int(k) <= comp and abs(int(k) - comp) <= 8), default=None)
+        if best_key:
+            return [(best_key, *value) for value in address_dict[best_key]]
+    return [None]
+
+@pytest.mark.parametrize("view", ["normalized", "diacritics"])
+def test_windowed_check_address_matches_full_scan(view):
+    for case in tests:
+        text = to_normalized(preprocess_input(case["text"]))
+        if view == "diacritics":
+            text = to_diacritics(text)
+        for address_type in ("provinces", "districts", "wards"):
+            for comp in range(len(text), 0, -7):
+                # last_address sao cho comp = end - len(detected) - 1
+                last_address = (comp + 1, None, None, "")
+                expected = full_scan_check_address(text, AUTOMATON[view], address_type, comp)
+                assert check_address(text, AUTOMATON[view], address_type, last_address) == expected
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from utils.index import AddressIndex
+
+def test_index_is_lazy():
+    index = AddressIndex()
+    assert index.loaded() == []
+
+    index.automaton["diacritics"]
+    assert index.loaded() == ["automaton"]
+
+def test_index_levels():
+    index = AddressIndex(levels=("provinces",), views=("normalized", "diacritics"))
+    result = index.process("Thôn Thành Bắc, Xã Quảng Thành, TP Thanh Hoá, Thanh Hoá")
+
+    assert result == ("Thanh Hóa", None, None)
+    assert "wards" not in index.bktree
+    assert "nospace" not in index.automaton
+    assert set(index.loaded()) <= {"automaton", "bktree.provinces"}
+    assert index.automaton.levels == ("provinces",)
+
+@pytest.mark.parametrize("views", [("normalized",), ("diacritics",), ("nospace",)])
+def test_index_restricted_views(views):
+    # bước trie của view không được load bị bỏ qua, BK-tree vẫn chạy
+    index = AddressIndex(levels=("provinces",), views=views)
+    assert index.process("Xã Quảng Thành, TP Thanh Hoá, Thanh Hoá")[0] == "Thanh Hóa"
+    assert index.automaton.views == views
+
+def test_index_build_matches_snapshot():
+    built = AddressIndex(snapshot_path=None)
+    loaded = AddressIndex()
+
+    assert list(built.automaton.automaton.items()) == list(loaded.automaton.automaton.items())
+    assert built.automaton.scan("xa tan an huyen cai lay") == loaded.automaton.scan("xa tan an huyen cai lay")
+    assert built.bktree["districts"].search("cau giay", max_distance=2) == loaded.bktree["districts"].search("cau giay", max_distance=2)
+
+@pytest.mark.parametrize("fuzzy", ["symspell", "qgram"])
+def test_index_fuzzy_backend_matches_bktree(fuzzy):
+    from utils.qgram import QGramTree
+    from utils.symspell import DeleteIndex
+
+    with open("test/latest_test.json", "r", encoding="utf-8") as f:
+        tests = json.load(f)[:50]
+    default = AddressIndex()
+    index = AddressIndex(fuzzy=fuzzy)
+
+    assert isinstance(index.bktree["wards"], {"symspell": DeleteIndex, "qgram": QGramTree}[fuzzy])
+    assert [index.process(case["text"]) for case in tests] == [default.process(case["text"]) for case in tests]
@@ -0,0 +1,71 @@
+import json
+import re
+
+from utils.input import (
+    ALIAS_ABBREV_MAP,
+    ALIAS_MULTI_MAP,
+    ALIAS_PLACE,
+    ALIAS_SINGLE_MAP,
+    build_abbreviation_rules,
+    build_multi_rules,
+    build_single_rules,
+    normalize_input,
+    preprocess_input,
+    preprocess_input_batch,
+    replace_alias,
+)
+from utils.input_v2 import ALIAS_RULES, expand_abbreviation, general_process_input
+
+with open("test/latest_test.json", "r", encoding="utf-8") as f:
+    tests = json.load(f)
+
+def expand_abbreviation_slow(text):
+    # expand_abbreviation cũ: chạy lần lượt mọi rule
+    input = text
+    for pattern, repl, _ in ALIAS_RULES:
+        input = pattern.sub(repl, input)
+    return input
+
+def test_expand_abbreviation_matches_sequential_rules():
+    texts = [
+        "t. phố hồ chí minh",
+        "tỉnh tỉnh phố, P12, q.3",
+        "T.P HCM, f3 Q10",
+        "h. c. minh, đ. đa, hn",
+        "x. tân phú, tt. ttr, thi xa, TX",
+        "İstanbul tİnh, p. ı, Tnh",
+        "p, h q x.t",
+    ]
+    for case in tests:
+        texts += [case["text"], general_process_input(case["text"])]
+
+    for text in texts:
+        assert expand_abbreviation(text) == expand_abbreviation_slow(text)
+
+def per_rule_replace_alias(text):
+    # replace_alias cũ: build rule mỗi lần gọi, gộp khoảng trắng sau từng rule
+    result = re.sub(r'(?:^|\s)f\.(?=\s|$)', ' phường ', text, flags=re.IGNORECASE)
+    for rules in (build_single_rules(ALIAS_SINGLE_MAP), build_abbreviation_rules(ALIAS_ABBREV_MAP), build_multi_rules(ALIAS_MULTI_MAP)):
+        for replace, pattern in rules.items():
+            result = re.sub(pattern, replace, result, flags=re.IGNORECASE)
+            result = re.sub(r"\s+", " ", result)
+    for replace, pattern in build_single_rules(ALIAS_PLACE).items():
+        result = re.sub(pattern, replace, result, flags=re.IGNORECASE)
+    return re.sub(r"\s+", " ", result).strip()
+
+def test_replace_alias_matches_per_rule_cleanup():
+    texts = [
+        "tp tp tt, tx. tỉnh xã",
+        "a , tp. f. b  p. t. phố",
+        "tỉnh tỉnh huyện,  q. 1 ,h. tnh",
+        "thi tran  ttr. tth, hcm hn đ. đa",
+    ]
+    texts += [case["text"] for case in tests]
+
+    # replace_alias nhận output của normalize_input (khoảng trắng đã gộp)
+    for text in map(normalize_input, texts):
+        assert replace_alias(text) == per_rule_replace_alias(text)
+
+def test_preprocess_input_batch():
+    texts = [case["text"] for case in tests]
+    assert preprocess_input_batch(texts) == [preprocess_input(text) for text in texts]
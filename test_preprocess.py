@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from utils.preprocess import (
+    clear_normalization_cache,
+    normalization_cache_info,
+    remove_diacritics,
+    to_diacritics,
+    to_diacritics_slow,
+    to_normalized,
+    to_normalized_no_comma_deleted,
+    to_normalized_slow,
+)
+
+def remove_diacritics_slow(s):
+    import unicodedata
+    return "".join(ch for ch in s if not any(unicodedata.category(c) == "Mn" for c in unicodedata.normalize("NFD", ch)))
+
+texts = []
+for level in ("provinces", "districts", "wards"):
+    with open(f"data/{level}.txt", "r", encoding="utf-8") as f:
+        texts += f.read().splitlines()
+with open("test/latest_test.json", "r", encoding="utf-8") as f:
+    texts += [case["text"] for case in json.load(f)]
+texts += [
+    "P12, Q.345 - TP.HCM/62 61 07",
+    "Tỉnh ² ١٢ ۳٤٥ Đắk Lắk",
+    "İstanbul ẞ ǅ x̣́ a\U0001D165́",
+    "1@2#3 ,4.5\t6 ạ",
+]
+
+@pytest.mark.parametrize("fast, slow", [
+    (to_normalized, to_normalized_slow),
+    (to_normalized_no_comma_deleted, lambda s: to_normalized_slow(s, ".-/")),
+    (to_diacritics, to_diacritics_slow),
+    (remove_diacritics, remove_diacritics_slow),
+])
+def test_translation_tables_match_char_by_char(fast, slow):
+    for text in texts:
+        assert fast(text) == slow(text), text
+
+def test_normalization_cache_counters():
+    clear_normalization_cache()
+    for _ in range(3):
+        assert to_normalized("Phường 12, Quận 3, TP HCM") == "phường 12 quận 3 tp hcm"
+    stats = normalization_cache_info()["normalized"]
+    # 6 token: "Phường", "12,", "Quận", "3,", "TP", "HCM"
+    assert stats["misses"] == 6 and stats["hits"] == 12
+    assert stats["size"] == 6 and stats["hit_rate"] == 12 / 18
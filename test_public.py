@@ -1,12 +1,8 @@
-from utils.data import get_data, get_prefix_dict
-from utils.trie import build_all_automaton, trie_pipeline
+from pipeline import AUTOMATON
+from utils.trie import trie_pipeline
 from utils.fuzz import fuzz_pipeline
 import sys
 sys.path.append("test")
-DATA = get_data()
-PREFIX = get_prefix_dict()
-
-AUTOMATON = build_all_automaton(DATA, PREFIX)
 
 import json
 import pytest
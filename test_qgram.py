@@ -0,0 +1,61 @@
+import Levenshtein
+import pytest
+
+from utils.bktree import BKTree, build_bk_trees
+from utils.data import get_data
+from utils.preprocess import to_normalized
+from utils.qgram import QGramIndex, QGramTree, grams
+from utils.spelling_error_pipeline import create_index, create_list, reference_matches
+
+DATA = get_data()
+TREE = build_bk_trees({"districts": DATA["districts"]}, [], to_normalized)["districts"]
+INDEX = QGramTree(TREE)
+QUERIES = ["cau giay", "cau giayy", "tan bnh", "quan 1", "bac tu liem", "thu duc", "hai ba trung", "xyz", "a", ""]
+
+def test_grams():
+    assert grams("abc", 2) == ["\x00a", "ab", "bc", "c\x00"]
+    assert grams("", 2) == ["\x00\x00"]
+    assert grams("ab", 3) == ["\x00\x00a", "\x00ab", "ab\x00", "b\x00\x00"]
+
+@pytest.mark.parametrize("q", [2, 3])
+@pytest.mark.parametrize("max_distance", [0, 1, 2, 4])
+def test_index_search_matches_linear_scan(q, max_distance):
+    index = QGramIndex(TREE.words, q)
+    for query in QUERIES:
+        expected = [(Levenshtein.distance(query, word), node) for node, word in enumerate(TREE.words)]
+        assert index.search(query, max_distance) == [hit for hit in expected if hit[0] <= max_distance]
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2, 3, 5])
+def test_qgram_tree_matches_tree(max_distance):
+    for query in QUERIES:
+        assert INDEX.search(query, max_distance=max_distance) == TREE.search(query, max_distance=max_distance)
+        for k in (1, 3):
+            assert INDEX.search_topk(query, k, max_distance) == TREE.search_topk(query, k, max_distance)
+        assert INDEX.search_topk(query, 1, max_distance, ties=True) == TREE.search_topk(query, 1, max_distance, ties=True)
+        if query:
+            assert INDEX.nearest_phrase_search(query, to_normalized) == TREE.nearest_phrase_search(query, to_normalized)
+
+def test_qgram_tree_insert_reindexes():
+    tree = BKTree("wards")
+    for word in ("tan dinh", "da kao", "ben nghe"):
+        tree.insert(word, word.title())
+    index = QGramTree(tree)
+
+    index.insert("ben thanh", "Ben Thanh")
+    assert index.search("ben thanhh", max_distance=1) == [("ben thanh", "Ben Thanh", 1)]
+    assert tree.size == 3
+
+def test_reference_matches_matches_linear_scan():
+    reference_list = create_list(set(DATA["districts"]))
+    index = create_index(reference_list)
+    for query in ("caugiay", "tanbnh", "1", "haibatrung"):
+        thresh = max(1, len(query) // 2)
+        expected = [(orig, Levenshtein.distance(query, cond)) for cond, orig in reference_list]
+        assert reference_matches(query, reference_list, index, thresh) == [match for match in expected if match[1] <= thresh]
+
+def test_extract_address_components_with_prebuilt_tables():
+    from utils.spelling_error_pipeline import create_tables, extract_address_components
+
+    tables = create_tables(DATA)
+    for text in ("Phường 3, Quận 1, Hồ Chí Minh", "Xã Quảng Thàn, TP Thanh Hoá, Thanh Hoá"):
+        assert extract_address_components(text, DATA, tables) == extract_address_components(text, DATA)
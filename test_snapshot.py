@@ -0,0 +1,45 @@
+from utils.data import get_prefix_dict
+from utils.snapshot import build_index, data_version, read_snapshot, write_snapshot
+
+PREFIX = get_prefix_dict()
+VERSION = data_version(PREFIX)
+PARTS, TIMINGS = build_index(PREFIX)
+
+def test_snapshot_roundtrip(tmp_path):
+    path = str(tmp_path / "index.snapshot")
+    write_snapshot(path, VERSION, PARTS)
+
+    snapshot = read_snapshot(path, VERSION)
+    assert snapshot is not None
+    assert set(snapshot.parts) == set(PARTS)
+    assert snapshot.get("data") == PARTS["data"]
+    assert snapshot.get("prefix") == PARTS["prefix"]
+
+    automaton = snapshot.get("automaton")
+    expected = PARTS["automaton"]
+    assert list(automaton.automaton.items()) == list(expected.automaton.items())
+    assert automaton.scan("phuong tan binh quan 1") == expected.scan("phuong tan binh quan 1")
+
+    tree = snapshot.get("bktree.wards")
+    assert tree.search("tan binh", max_distance=1) == PARTS["bktree.wards"].search("tan binh", max_distance=1)
+
+def test_snapshot_version_mismatch(tmp_path):
+    path = str(tmp_path / "index.snapshot")
+    write_snapshot(path, VERSION, {"data": PARTS["data"]})
+    assert read_snapshot(path, "other") is None
+
+def test_snapshot_missing_or_corrupt(tmp_path):
+    assert read_snapshot(str(tmp_path / "missing.snapshot"), VERSION) is None
+
+    path = tmp_path / "corrupt.snapshot"
+    path.write_bytes(b"not a snapshot")
+    assert read_snapshot(str(path), VERSION) is None
+
+def test_parallel_build_matches_sequential():
+    parts, timings = build_index(PREFIX, workers=2)
+
+    assert list(parts) == list(PARTS)
+    assert "automaton" in timings and "bktree.wards" in timings
+    assert list(parts["automaton"].automaton.items()) == list(PARTS["automaton"].automaton.items())
+    assert parts["automaton"].names == PARTS["automaton"].names
+    assert parts["bktree.wards"].search("phu my", max_distance=1) == PARTS["bktree.wards"].search("phu my", max_distance=1)
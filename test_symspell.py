@@ -0,0 +1,35 @@
+import pytest
+
+from utils.bktree import BKTree, build_bk_trees
+from utils.data import get_data
+from utils.preprocess import to_normalized
+from utils.symspell import DeleteIndex, deletes
+
+TREE = build_bk_trees({"districts": get_data()["districts"]}, [], to_normalized)["districts"]
+INDEX = DeleteIndex(TREE)
+QUERIES = ["cau giay", "cau giayy", "tan bnh", "quan 1", "bac tu liem", "thu duc", "hai ba trung", "xyz", "a"]
+
+def test_deletes():
+    assert deletes("abc", 0) == {"abc"}
+    assert deletes("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert deletes("abc", 2) == {"abc", "bc", "ac", "ab", "a", "b", "c"}
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2, 3])
+def test_delete_index_matches_tree(max_distance):
+    for query in QUERIES:
+        assert INDEX.search(query, max_distance=max_distance) == TREE.search(query, max_distance=max_distance)
+        for k in (1, 3):
+            assert INDEX.search_topk(query, k, max_distance) == TREE.search_topk(query, k, max_distance)
+        assert INDEX.search_topk(query, 1, max_distance, ties=True) == TREE.search_topk(query, 1, max_distance, ties=True)
+        assert INDEX.nearest_phrase_search(query, to_normalized) == TREE.nearest_phrase_search(query, to_normalized)
+
+def test_delete_index_insert_reindexes():
+    tree = BKTree("wards")
+    for word in ("tan dinh", "da kao", "ben nghe"):
+        tree.insert(word, word.title())
+    index = DeleteIndex(tree)
+
+    index.insert("ben thanh", "Ben Thanh")
+    assert index.search("ben thanhh", max_distance=1) == [("ben thanh", "Ben Thanh", 1)]
+    # cây gốc không bị thay đổi
+    assert tree.size == 3
@@ -0,0 +1,60 @@
+import json
+
+from pipeline import BKTREE
+from utils.bktree import address_ranges, bktree_find, split_text_for_address
+from utils.input_v2 import preprocess_input
+from utils.preprocess import to_diacritics, to_nospace
+from utils.preprocess import to_normalized_no_comma_deleted as to_normalized
+from utils.tokens import NormalizedText, TokenStream
+from utils.trie_pipeline_v2 import PREFIX_DICT
+
+with open("test/latest_test.json", "r", encoding="utf-8") as f:
+    tests = json.load(f)
+
+def test_token_stream_offsets():
+    for case in tests:
+        raw = preprocess_input(case["text"])
+        stream = TokenStream(raw, to_normalized)
+        assert stream.text == to_normalized(raw)
+        for token in stream:
+            assert stream.text[token.start : token.end] == token.text
+            assert token.text in to_normalized(raw[token.raw_start : token.raw_end]).split()
+
+def test_address_ranges_match_split():
+    for case in tests:
+        words = to_normalized(case["text"]).split()
+        assert [" ".join(words[first:last]) for first, last in address_ranges(len(words))] == split_text_for_address(" ".join(words))
+
+def test_bktree_find_offsets_of_repeated_phrase():
+    # phrase lặp lại / nằm trong từ khác: vị trí phải là của đúng các token được so khớp
+    for text in ["tan an an", "quang ngai thanh pho quang ngai", "long dien, huyen long dien"]:
+        stream = TokenStream(text)
+        # các phrase được so khớp kết thúc ở một trong 3 token cuối
+        ends = {token.raw_end for token in stream[-3:]}
+        for address_type in ("provinces", "districts", "wards"):
+            for idx_diff, _, _, detected_input in bktree_find(text, BKTREE[address_type], PREFIX_DICT, to_normalized, address_type):
+                end = len(text) - idx_diff
+                assert end in ends
+                assert text[:end].endswith(detected_input.split()[-1])
+
+def test_normalized_text_views_and_offsets():
+    texts = [preprocess_input(case["text"]) for case in tests] + ["Tỉnh ² ١٢ ۳٤٥ Đắk Lắk", "q.1,  p 12 - hcm"]
+    for raw in texts:
+        text = NormalizedText(raw, to_normalized)
+        assert text.normalized == to_normalized(raw)
+        assert text.diacritics == to_diacritics(text.normalized)
+        assert text.nospace == to_nospace(text.diacritics)
+
+        for i, ch in enumerate(text.nospace):
+            assert text.diacritics[text.nospace_offsets[i]] == ch
+            assert ch in to_diacritics(text.normalized[text.normalized_offset("nospace", i)])
+
+        # mỗi token tìm trong view nospace được map về đúng từ gốc
+        position = 0
+        for token in text.tokens:
+            word = to_nospace(to_diacritics(token.text))
+            if not word:
+                continue
+            start = text.nospace.index(word, position)
+            position = start + len(word)
+            assert text.raw_span("nospace", start, position) == (token.raw_start, token.raw_end)
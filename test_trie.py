@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from pipeline import AUTOMATON
+from utils.input import preprocess_input
+from utils.preprocess import to_diacritics, to_normalized, to_nospace
+from utils.trie import check_automaton, classify_with_trie, cut_normalized, match_table, remaining_length, remove_detected, score
+
+with open("test/latest_test.json", "r", encoding="utf-8") as f:
+    tests = json.load(f)
+
+def string_check_automaton(automaton, input, address_type):
+    # check_automaton cũ: dựng remaining / origin cho mọi candidate
+    best_candidates = {}
+    for end, prefix, words, length in match_table(automaton, input).get(address_type, ()):
+        start = end - length + 1
+        for word in words:
+            if word.isdigit() and (end + 1) < len(input) and input[end + 1].isdigit():
+                continue
+            remaining, origin = remove_detected(input, (start, end))
+            remaining, origin = to_normalized(remaining), to_normalized(origin)
+            candidate = (remaining, prefix, origin)
+            if word not in best_candidates:
+                best_candidates[word] = [candidate]
+            else:
+                current_best_len = len(best_candidates[word][0][0]) + len(best_candidates[word][0][1])
+                if len(remaining) < current_best_len:
+                    best_candidates[word] = [candidate]
+                elif len(remaining) == current_best_len and candidate not in best_candidates[word]:
+                    best_candidates[word].append(candidate)
+    return [(k, rem, pre, org) for k, vals in best_candidates.items() for rem, pre, org in vals]
+
+@pytest.mark.parametrize("text", ["q 1 p 12 3", "12 3 p 4", "x 1 2", "a b c", "1 2"])
+def test_remaining_length(text):
+    for start in range(len(text)):
+        for end in range(start, len(text)):
+            remaining, origin = remove_detected(text, (start, end))
+            length = remaining_length(text, start, end)
+            if length is not None:
+                assert length == len(to_normalized(remaining))
+                assert cut_normalized(text, start, end) == (to_normalized(remaining), to_normalized(origin))
+
+def test_check_automaton_matches_string_candidates():
+    texts = ["p12q3 hcm", "phuong 12 3 quan 1", "thi tran 1 2 huyen 5"]
+    for case in tests:
+        normalized = to_normalized(preprocess_input(case["text"]))
+        texts += [normalized, to_diacritics(normalized), to_nospace(to_diacritics(normalized))]
+
+    for text in texts:
+        for view in ("normalized", "diacritics", "nospace"):
+            for address_type in ("provinces", "districts", "wards"):
+                expected = string_check_automaton(AUTOMATON[view], text, address_type)
+                assert check_automaton(AUTOMATON[view], text, address_type) == expected
+
+def test_beam_search():
+    for case in tests[:200]:
+        text = preprocess_input(case["text"])
+        for view in ("normalized", "diacritics", "nospace"):
+            exhaustive = classify_with_trie(text, AUTOMATON, view)
+            # beam đủ rộng: đúng tập candidate của duyệt toàn bộ
+            unbounded = classify_with_trie(text, AUTOMATON, view, beam_width=10**6)
+            assert sorted(map(repr, unbounded)) == sorted(map(repr, exhaustive))
+
+            beam = classify_with_trie(text, AUTOMATON, view, beam_width=5)
+            assert len(beam) <= 5
+            assert [output[3] for output in beam] == sorted((output[3] for output in beam), reverse=True)
+            if exhaustive:
+                assert beam[0][3] == max(output[3] for output in exhaustive)
+
+def test_score_features_match_computed_score():
+    features = AUTOMATON["normalized"].features
+    for case in tests[:200]:
+        text = preprocess_input(case["text"])
+        for view in ("normalized", "diacritics", "nospace"):
+            for address, remaining, prefix, _, origin in classify_with_trie(text, AUTOMATON, view):
+                assert score(address, prefix, remaining, view, origin, features) == score(address, prefix, remaining, view, origin)
+
+def test_scan_cache_lives_on_automaton():
+    import gc
+    import pickle
+    import weakref
+
+    from utils.trie import SCAN_CACHE_SIZE, build_automaton, match_tables
+
+    automaton = build_automaton({"provinces": ["Hà Nội", "Hà Nam"]}, {"full": {"normalized": {"provinces": ["tỉnh"]}}})
+    first = match_tables(automaton, "tinh ha nam")
+    assert match_tables(automaton, "tinh ha nam") is first
+    for i in range(SCAN_CACHE_SIZE):
+        match_tables(automaton, f"ha noi {i}")
+    assert len(automaton._scans) == SCAN_CACHE_SIZE
+    assert match_tables(automaton, "tinh ha nam") is not first
+
+    # cache không nằm trong pickle, automaton được giải phóng khi không còn dùng
+    loaded = pickle.loads(pickle.dumps(automaton))
+    assert not loaded._scans and loaded.scan("tinh ha nam") == first
+    reference = weakref.ref(automaton)
+    del automaton, loaded, first
+    gc.collect()
+    assert reference() is None
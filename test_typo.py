@@ -0,0 +1,52 @@
+from utils.data import get_data
+from utils.index import AddressIndex
+from utils.trie_pipeline_v2 import NormalizedText, classify_trie_typo, is_whole_words, to_normalized
+from utils.typo import build_typo_automaton, build_typo_entries, edit1_variants
+
+DATA = get_data()
+TYPO = build_typo_automaton(DATA, ("provinces",))
+
+def test_edit1_variants():
+    assert edit1_variants("abc") == {"bc": "drop", "aabc": "double", "bac": "swap", "ac": "drop", "abbc": "double", "acb": "swap", "ab": "drop", "abcc": "double"}
+    # không xóa chữ cái của từ ngắn hơn 3 chữ, không đổi chỗ qua khoảng trắng
+    assert edit1_variants("ba vi") == {"bba vi": "double", "ab vi": "swap", "baa vi": "double", "ba vvi": "double", "ba iv": "swap", "ba vii": "double"}
+
+def test_typo_entries_skip_names_and_short_keys():
+    entries, edits = build_typo_entries({"provinces": ["Hà Nam", "Hà Nội"], "districts": ["Hà Nm"]}, ("provinces",), min_length=5)
+    diacritics = entries["diacritics"]
+    assert "ha nm" not in diacritics  # là tên của cấp khác
+    assert diacritics["ha noii"] == {"provinces": ("", ["Hà Nội"])} and edits["ha noii"] == "double"
+    assert "hà nộii" in entries["normalized"]
+    assert not build_typo_entries({"provinces": ["Huế"]}, min_length=5)[0]["diacritics"]
+
+def test_typo_automaton_edit_type():
+    assert TYPO.levels == ("provinces",)
+    assert TYPO.edit("tien gang") == "drop"
+    assert TYPO.edit("quanng tri") == "double"
+    assert TYPO.edit("qaung tri") == "swap"
+    assert TYPO.edit("quang tri") is None
+
+def test_classify_trie_typo():
+    text = NormalizedText(to_normalized("Xã Tân An, Huyện Cai Lậy, Tỉnh Tiền Gang"), to_normalized)
+    _, (_, name, prefix, detected) = classify_trie_typo(text, TYPO, "provinces")
+    assert (name, prefix, detected) == ("Tiền Giang", "tỉnh", "tỉnh tiền gang")
+    # input không dấu: khớp ở view diacritics
+    plain = NormalizedText(to_normalized("xa tan an, huyen cai lay, tinh tien gang"), to_normalized)
+    assert classify_trie_typo(plain, TYPO, "provinces")[1][1] == "Tiền Giang"
+    assert classify_trie_typo(text, TYPO, "districts") is None
+    assert classify_trie_typo(text, None, "provinces") is None
+    # không khớp giữa một từ
+    assert classify_trie_typo(NormalizedText("xtien gang", to_normalized), TYPO, "provinces") is None
+
+def test_is_whole_words():
+    assert is_whole_words("tinh tien gang", 5, 14)
+    assert not is_whole_words("tinhtien gang", 4, 13)
+    assert not is_whole_words("tinh tien gangx", 5, 14)
+
+def test_index_typo_levels():
+    index = AddressIndex(levels=("provinces", "districts"), typo_levels=("provinces", "wards"))
+    assert index.typo_levels == ("provinces",)
+    assert index.result_version.endswith(":typo=provinces")
+    assert AddressIndex().typo is None
+    assert index.process("Xã Tân An, Huyện Cai Lậy, Tỉnh Tiền Gang")[0] == "Tiền Giang"
+    assert "typo" in index.loaded()
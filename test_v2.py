@@ -1,17 +1,10 @@
 from tkinter import UNDERLINE
-from utils.data import get_data, get_prefix_dict
+from pipeline import AUTOMATON, BKTREE
 from utils.input_v2 import preprocess_input
-from utils.trie import build_all_automaton
-from utils.preprocess import to_normalized
 from utils.trie_pipeline_v2 import full_pipeline
-from utils.bktree import build_bk_trees
 import time
 import sys
 sys.path.append("test")
-DATA = get_data()
-PREFIX = get_prefix_dict()
-AUTOMATON = build_all_automaton(DATA, PREFIX)
-BKTREE = build_bk_trees(DATA, PREFIX["full"]["normalized"], to_normalized)
 
 import json
 import pytest
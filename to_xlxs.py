@@ -2,17 +2,14 @@ import pandas as pd
 import json
 import sys
 
-from utils.data import get_data, get_prefix_dict
-from utils.trie import build_all_automaton, trie_pipeline
+from utils.trie import trie_pipeline
 from utils.preprocess import to_normalized
 from utils.fuzz import fuzz_pipeline
 from utils.input import preprocess_input, select_candidate_by_order_administrative
 sys.path.append("test")
 
 # Load data
-DATA = get_data()
-PREFIX = get_prefix_dict()
-AUTOMATON = build_all_automaton(DATA, PREFIX)
+from pipeline import AUTOMATON
 
 with open("test/latest_test.json", "r", encoding="utf-8") as f:
     tests = json.load(f)
@@ -4,6 +4,7 @@ Vietnamese Address Matcher - Library Version
 A high-performance Vietnamese address classification system using BK-trees.
 """
 
+import heapq
 import unicodedata
 import re
 from typing import Any, List, Dict, Literal, Tuple, Optional
@@ -92,9 +93,42 @@ class BKTree:
         _search_recursive(self.root)
         return sorted(results, key=lambda x: x[1])  # Sort by distance
     
+    def search_topk(self, word: str, k: int = 1, max_distance: int = 2) -> List[Tuple[str, int]]:
+        """
+        The first k results of search (by distance, then tree order), best-first:
+        subtrees are visited by lower bound |d(query, parent) - edge| and the bound
+        tightens to the k-th best distance found so far
+        """
+        if self.root is None or k <= 0:
+            return []
+        
+        word = self.normalize_text(word)
+        best = []  # (distance, path, word)
+        bound = max_distance
+        # path = các cạnh từ root: so sánh path = thứ tự duyệt của search
+        heap = [(0, (), self.root)]
+        while heap:
+            lower, path, node = heapq.heappop(heap)
+            if lower > bound:
+                break
+            distance = Levenshtein.distance(node.word, word)
+            if distance <= bound:
+                best.append((distance, path, node.word))
+                if len(best) >= k:
+                    best.sort()
+                    best = best[:k]
+                    bound = best[-1][0]
+            
+            for child_distance, child in node.children.items():
+                gap = abs(distance - child_distance)
+                if gap <= bound:
+                    heapq.heappush(heap, (max(lower, gap), path + (child_distance,), child))
+        
+        return [(match, distance) for distance, _, match in sorted(best)]
+    
     def get_closest_match(self, word: str, max_distance: int = 3) -> Optional[Tuple[str, int]]:
         """Get the closest match for a word"""
-        results = self.search(word, max_distance)
+        results = self.search_topk(word, 1, max_distance)
         return results[0] if results else None
 
 
@@ -150,7 +184,7 @@ def search_best_in_tree(tree_type: str, query: str, max_distance: int = 3):
         return None
     
     tree = _bk_trees[tree_type]
-    results = tree.search(query, max_distance)
+    results = tree.search_topk(query, 1, max_distance)
     return results[0] if results else None
 
 
@@ -186,8 +220,8 @@ def find_best_match_advanced(input_string: str, bk_tree_type: Literal['provinces
         match = cached_search_best_in_tree(bk_tree_type, two_word_query, max_distance)
         if match:
             candidates.append({
-                'match': match[0],
-                'distance': match[1],
+                'match': match[-2],
+                'distance': match[-1],
                 'word_count': 2,
                 'query': two_word_query
             })
@@ -199,8 +233,8 @@ def find_best_match_advanced(input_string: str, bk_tree_type: Literal['provinces
             match = cached_search_best_in_tree(bk_tree_type, three_word_query, max_distance)
             if match:
                 candidates.append({
-                    'match': match[0],
-                    'distance': match[1],
+                    'match': match[-2],
+                    'distance': match[-1],
                     'word_count': 3,
                     'query': three_word_query
                 })
@@ -2,15 +2,22 @@
 """
 Vietnamese Address Matcher - Library Version
 A high-performance Vietnamese address classification system using BK-trees.
+
+numpy is an optional dependency (not in requirements.txt): only the batch
+search (cdist_nearest_phrases / bktree_find_batch) needs it and imports it
+when called.
 """
 
 import unicodedata
 import re
-from typing import Any, List, Dict, Literal, Tuple, Optional
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Iterable, Iterator, List, Dict, Literal, Tuple, Optional
 from functools import lru_cache
 import Levenshtein
-from itertools import groupby
+from itertools import count, groupby, takewhile
 from utils.decorators import track_input, track_time_ns, track_variable
+from utils.tokens import TokenStream
 
 from rapidfuzz import process, fuzz
 
@@ -18,22 +25,24 @@ from rapidfuzz import process, fuzz
 # BK-Tree Implementation
 # ============================================================================
 
-class BKTreeNode:
-    """Node in a BK-tree"""
-    def __init__(self, *args):
-        if len(args) == 2:
-            self.word = args[0]
-            self.core = args[1]       
-        self.children = {}
-
 class BKTree:
     """
     Burkhard-Keller Tree for efficient fuzzy string matching
+
+    Nodes are ids into words / cores. Once built (compact), the tree is stored
+    in flat arrays: node ids in preorder, the edges of node i are
+    edge_start[i]:edge_start[i + 1], sorted by edge_distance, to edge_child.
     """
     def __init__(self, tree_type: str = "generic"):
-        self.root = None
         self.tree_type = tree_type  # "districts", "wards", "provinces", or "generic"
         self.size = 0
+        self.words: list[str] = []
+        self.cores: list[str] = []
+        self.edge_start = array("I", [0])
+        self.edge_distance = array("H")
+        self.edge_child = array("I")
+        # children[i] = {distance: child id} trong lúc insert, None khi đã compact
+        self._children: list[dict[int, int]] | None = []
     
     def normalize_text(self, text: str) -> str:
         """Normalize Vietnamese text for better matching"""
@@ -42,54 +51,206 @@ class BKTree:
         # Normalize unicode characters
         text = unicodedata.normalize('NFC', text)
         return text
+
+    def _building_children(self) -> list[dict[int, int]]:
+        if self._children is None:
+            # insert sau khi compact: dựng lại dict children từ mảng
+            self._children = [
+                dict(zip(self.edge_distance[self.edge_start[i] : self.edge_start[i + 1]],
+                         self.edge_child[self.edge_start[i] : self.edge_start[i + 1]]))
+                for i in range(len(self.words))
+            ]
+        return self._children
     
     def insert(self, word: str, core : str):
         """Insert a word into the BK-tree"""       
-        if self.root is None:
-            self.root = BKTreeNode(word, core)
+        children = self._building_children()
+        if not self.words:
+            self.words.append(word)
+            self.cores.append(core)
+            children.append({})
             self.size += 1
             return
         
-        current = self.root
+        current = 0
         while True:
-            distance = Levenshtein.distance(current.word, word)
+            distance = Levenshtein.distance(self.words[current], word)
             
             if distance == 0:
                 return
             
-            if distance in current.children:
-                current = current.children[distance]
-            else:
-                current.children[distance] = BKTreeNode(word, core)
+            child = children[current].get(distance)
+            if child is None:
+                children[current][distance] = len(self.words)
+                self.words.append(word)
+                self.cores.append(core)
+                children.append({})
                 self.size += 1
                 break
+            current = child
+
+    def compact(self):
+        """Move the tree into the flat arrays: preorder ids, children ordered by edge distance"""
+        children = self._children
+        if children is None:
+            return
+
+        order = []
+        stack = [0] if self.words else []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(child for _, child in sorted(children[node].items(), reverse=True))
+        new_id = {old: new for new, old in enumerate(order)}
+
+        edge_start, edge_distance, edge_child = array("I", [0]), array("H"), array("I")
+        for old in order:
+            for distance, child in sorted(children[old].items()):
+                edge_distance.append(distance)
+                edge_child.append(new_id[child])
+            edge_start.append(len(edge_child))
+
+        self.words = [self.words[old] for old in order]
+        self.cores = [self.cores[old] for old in order]
+        self.edge_start, self.edge_distance, self.edge_child = edge_start, edge_distance, edge_child
+        self._children = None
     
     def search(self, word: str, preprocess = None, max_distance: int = 2):
         """
         Search for words within max_distance of the query word
-        Returns list of (word, distance) tuples
+        Returns list of (word, core, distance) tuples
         """
-        if self.root is None:
+        if not self.words:
             return []
+        self.compact()
         
         results = []
         word = preprocess(word) if preprocess else word.lower()
-        
-        def _search(node: BKTreeNode):
-            distance = Levenshtein.distance(node.word, word)
+        words, cores = self.words, self.cores
+        edge_start, edge_distance, edge_child = self.edge_start, self.edge_distance, self.edge_child
+        distance_to = Levenshtein.distance
+
+        # duyệt preorder bằng stack: cùng thứ tự với bản đệ quy
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            start, end = edge_start[node], edge_start[node + 1]
+            distance = distance_to(words[node], word)
             
             if distance <= max_distance:
-                results.append((node.word, node.core, distance))
-            
-            for child_distance in range(max(1, distance - max_distance), 
-                                      distance + max_distance + 1):
-                if child_distance in node.children:
-                    _search(node.children[child_distance])
-        
-        _search(self.root)
+                results.append((words[node], cores[node], distance))
+
+            if start < end:
+                # cạnh trong [distance - max_distance, distance + max_distance] (cạnh luôn >= 1)
+                first = bisect_left(edge_distance, distance - max_distance, start, end)
+                last = bisect_right(edge_distance, distance + max_distance, first, end)
+                if first < last:
+                    stack.extend(reversed(edge_child[first:last]))
         
         return sorted(results, key=lambda x: x[1])  # Sort by distance
-    
+
+    def search_thresholds(self, word: str, thresholds: Iterable[int], preprocess=None):
+        """
+        Yield search(word, preprocess, t) for each increasing t in thresholds
+        from a single traversal: nodes reached at a lower threshold keep their
+        distance, a higher threshold only visits the edges it newly opens.
+        """
+        if not self.words:
+            for _ in thresholds:
+                yield []
+            return
+        self.compact()
+
+        word = preprocess(word) if preprocess else word.lower()
+        words, cores = self.words, self.cores
+        edge_start, edge_distance, edge_child = self.edge_start, self.edge_distance, self.edge_child
+        distance_to = Levenshtein.distance
+
+        found: list[tuple[int, int]] = []  # (node, distance) của mọi node đã tính
+        # node còn cạnh chưa mở: (node, distance, first, last) với [first, last) là các cạnh đã mở
+        frontier: list[tuple[int, int, int, int]] = []
+        stack = [0]
+        for threshold in thresholds:
+            pending, frontier = frontier, []
+            for node, distance, first, last in pending:
+                start, end = edge_start[node], edge_start[node + 1]
+                new_first = bisect_left(edge_distance, distance - threshold, start, first)
+                new_last = bisect_right(edge_distance, distance + threshold, last, end)
+                stack.extend(edge_child[new_first:first])
+                stack.extend(edge_child[last:new_last])
+                if new_first > start or new_last < end:
+                    frontier.append((node, distance, new_first, new_last))
+
+            while stack:
+                node = stack.pop()
+                start, end = edge_start[node], edge_start[node + 1]
+                distance = distance_to(words[node], word)
+                found.append((node, distance))
+                if start < end:
+                    first = bisect_left(edge_distance, distance - threshold, start, end)
+                    last = bisect_right(edge_distance, distance + threshold, first, end)
+                    stack.extend(edge_child[first:last])
+                    if first > start or last < end:
+                        frontier.append((node, distance, first, last))
+
+            # id node là thứ tự preorder -> cùng thứ tự kết quả với search
+            hits = sorted((node, distance) for node, distance in found if distance <= threshold)
+            yield sorted(((words[node], cores[node], distance) for node, distance in hits), key=lambda x: x[1])
+
+    def search_topk(self, word: str, k: int = 1, max_distance: int = 2, preprocess=None, ties: bool = False):
+        """
+        The k nearest words within max_distance as (word, core, distance) tuples,
+        ordered by distance then tree order (= the first k of search sorted by distance).
+        Best-first: subtrees are visited by their lower bound (max over the path of
+        |d(query, parent) - edge|), the bound tightens to the k-th best distance
+        found so far and the search stops once no subtree can beat it.
+        With ties, every word at the k-th best distance is kept.
+        """
+        if not self.words or k <= 0:
+            return []
+        self.compact()
+
+        word = preprocess(word) if preprocess else word.lower()
+        words, cores = self.words, self.cores
+        edge_start, edge_distance, edge_child = self.edge_start, self.edge_distance, self.edge_child
+        distance_to = Levenshtein.distance
+
+        best: list[tuple[int, int]] = []  # (distance, node)
+        bound = max_distance
+        # hàng đợi ưu tiên theo cận dưới (số nguyên 0..max_distance): mỗi mức một stack
+        buckets: list[list[int]] = [[] for _ in range(max_distance + 1)]
+        buckets[0].append(0)
+        for lower, stack in enumerate(buckets):
+            while stack and lower <= bound:
+                node = stack.pop()
+                distance = distance_to(words[node], word)
+                if distance <= bound:
+                    best.append((distance, node))
+                    if len(best) >= k:
+                        # đủ k kết quả: ngưỡng thu hẹp về khoảng cách thứ k
+                        best.sort()
+                        bound = best[k - 1][0]
+                        best = [hit for hit in best if hit[0] <= bound] if ties else best[:k]
+
+                # con qua cạnh e có cận dưới max(lower, |distance - e|), bỏ qua nếu > bound
+                start, end = edge_start[node], edge_start[node + 1]
+                if start == end:
+                    continue
+                first = bisect_left(edge_distance, distance - bound, start, end)
+                middle = bisect_left(edge_distance, distance - lower, first, end)
+                after = bisect_right(edge_distance, distance + lower, middle, end)
+                last = bisect_right(edge_distance, distance + bound, after, end)
+                if middle < after:
+                    stack.extend(edge_child[middle:after])
+                for index in range(first, middle):
+                    buckets[distance - edge_distance[index]].append(edge_child[index])
+                for index in range(after, last):
+                    buckets[edge_distance[index] - distance].append(edge_child[index])
+            if lower >= bound:
+                break
+
+        return [(words[node], cores[node], distance) for distance, node in sorted(best)]
+
     @track_time_ns
     def progressive_search(self, text: str, preprocess=None):
         """
@@ -99,15 +260,14 @@ class BKTree:
             2. "phố hồ chí minh"
             3. "hồ chí minh"
         """
-        words = text.split()
+        stream = TokenStream(text)
         results = []
 
         # từ trái sang phải, giảm dần cụm
-        for i in range(len(words) - 1):  # dừng sớm để tránh cụm quá ngắn
-            phrase = " ".join(words[i:])
+        for i in range(len(stream) - 1):  # dừng sớm để tránh cụm quá ngắn
+            phrase = stream.phrase(i, len(stream))
             max_dist = auto_distance(phrase)
-            start_index = text.index(phrase)
-            end_index = start_index + len(phrase)
+            _, end_index = stream.raw_span(i, len(stream))
             found = self.search(phrase, preprocess=preprocess, max_distance=max_dist)
             if found:
                 for _, core, dist in found:
@@ -134,41 +294,90 @@ class BKTree:
         - Stops early if good matches found (low relative distance).
         """
 
-        if self.root is None:
+        if not self.words:
             return []
 
         phrase = preprocess(phrase) if preprocess else phrase.lower()
         length = len(phrase)
 
-        # Cơ sở distance ban đầu — tỷ lệ theo độ dài cụm
-        if base_distance is None:
-            base_distance = max(2, int(length * 0.08))  # khoảng 8% độ dài cụm
-
+        # cùng dãy ngưỡng như khi gọi search lại với max_distance + 1, nhưng chỉ duyệt cây một lần
+        thresholds = phrase_thresholds(length, base_distance, max_expand, distance_ratio_cutoff)
         results = []
-        current_distance = base_distance
-        best_ratio = 1.0
-        # curr_ratio = current_distance/length if length > 4 else 1/length
-        curr_ratio = current_distance/length 
-        while current_distance <= max_expand and curr_ratio <= distance_ratio_cutoff*1.5:
-            results = self.search(phrase, preprocess, max_distance=current_distance)
+        for results in self.search_thresholds(phrase, thresholds, preprocess):
             if not results:
-                current_distance += 1
-                curr_ratio = current_distance/length
                 continue
 
-            # Tính tỉ lệ khoảng cách tốt nhất hiện có
+            # Dừng sớm nếu tỉ lệ khoảng cách tốt nhất đạt ngưỡng độ gần mong muốn
             best_distance = min(r[-1] for r in results)
-            best_ratio = best_distance / max(1, length)
-
-            # Dừng sớm nếu đạt ngưỡng độ gần mong muốn
-            if best_ratio <= distance_ratio_cutoff:
+            if best_distance / max(1, length) <= distance_ratio_cutoff:
                 break
 
-            current_distance += 1
-            curr_ratio = current_distance/length
-            
         return sorted(results, key=lambda x: (x[-1], -len(x[-2])))
 
+    @track_time_ns
+    def nearest_phrase_search(
+        self,
+        phrase: str,
+        preprocess=None,
+        base_distance: int | None = None,
+        max_expand: int = 5,
+        distance_ratio_cutoff: float = 0.25,
+    ) -> list[tuple[str, str, int]]:
+        """
+        The best-distance group of dynamic_phrase_search (same tuples, same order).
+        That group is every word at the minimum distance if it is within the
+        last threshold, so a best-first search_topk at that threshold finds it.
+        """
+        if not self.words:
+            return []
+
+        phrase = preprocess(phrase) if preprocess else phrase.lower()
+        thresholds = list(phrase_thresholds(len(phrase), base_distance, max_expand, distance_ratio_cutoff))
+        if not thresholds:
+            return []
+
+        found = self.search_topk(phrase, 1, thresholds[-1], preprocess, ties=True)
+        return nearest_order(found)
+
+    def phrase_query(
+        self,
+        phrase: str,
+        preprocess=None,
+        base_distance: int | None = None,
+        max_expand: int = 5,
+        distance_ratio_cutoff: float = 0.25,
+    ) -> tuple[str, int] | None:
+        """(query, distance bound) searched by nearest_phrase_search for phrase, None if it searches nothing"""
+        phrase = preprocess(phrase) if preprocess else phrase.lower()
+        thresholds = list(phrase_thresholds(len(phrase), base_distance, max_expand, distance_ratio_cutoff))
+        if not thresholds:
+            return None
+        # search_topk tiền xử lý phrase thêm một lần
+        return (preprocess(phrase) if preprocess else phrase.lower()), thresholds[-1]
+
+    def nearest_phrases(self, phrases: list[str], preprocess=None) -> list[list[tuple[str, str, int]]]:
+        """nearest_phrase_search of every phrase of one input"""
+        return [self.nearest_phrase_search(phrase, preprocess) for phrase in phrases]
+
+def nearest_order(found: list[tuple[str, str, int]]) -> list[tuple[str, str, int]]:
+    """Order of the best-distance group of dynamic_phrase_search: by core, longest core first (stable)"""
+    return sorted(sorted(found, key=lambda x: x[1]), key=lambda x: -len(x[1]))
+
+def phrase_thresholds(
+    length: int,
+    base_distance: int | None = None,
+    max_expand: int = 5,
+    distance_ratio_cutoff: float = 0.25,
+) -> Iterator[int]:
+    """Increasing search distances tried by dynamic_phrase_search for a phrase of the given length"""
+    # Cơ sở distance ban đầu — tỷ lệ theo độ dài cụm
+    if base_distance is None:
+        base_distance = max(2, int(length * 0.08))  # khoảng 8% độ dài cụm
+    return takewhile(
+        lambda distance: distance <= max_expand and distance / length <= distance_ratio_cutoff * 1.5,
+        count(base_distance),
+    )
+
 def auto_distance(phrase: str) -> int:
         phrase = phrase.strip()
         n_chars = len(phrase)
@@ -196,6 +405,7 @@ def build_bk_trees(data : dict[str , list[Any]], prefix_dict : dict[str, list[st
         for item in values:
             core = preprocess(item)
             tree.insert(core, item)
+        tree.compact()
         trees[tree_type] = tree
     
     return trees
@@ -208,53 +418,64 @@ def fuzzy_prefix(word: str, prefix_dict: dict[str, list[str]], address_type : Li
         return (word, best, score) if score > 60 else None
     return (word, best, score) if score > 80 else None
 
-def split_text_for_address(text : str):
+def address_ranges(count : int) -> list[tuple[int, int]]:
     """
-    Split text into words and phrases for address matching
+    Token ranges [first, last) of the phrases checked for an address among the
+    first count tokens: the last 4 / 3 / 2 / 1 words and their shifted windows
     """
-    words = text.split()
-    phrases = []
-    if len(words) >= 4:
-        phrases.append( " ".join(words[-4:]))
+    ranges = []
+    if count >= 4:
+        ranges.append((count - 4, count))
     
-    if len(words) >= 3:
-        phrases.append( " ".join(words[-3:]))
-    if len(words) >= 4:
-        phrases.append( " ".join(words[-4:-1]))
+    if count >= 3:
+        ranges.append((count - 3, count))
+    if count >= 4:
+        ranges.append((count - 4, count - 1))
         
-    if len(words) >= 2:
-        phrases.append(" ".join(words[-2:]))
-    if len(words) >= 3:
-        phrases.append(" ".join(words[-3:-1]))
+    if count >= 2:
+        ranges.append((count - 2, count))
+    if count >= 3:
+        ranges.append((count - 3, count - 1))
         
-    if len(words) >= 1:
-        phrases.append(words[-1])
-    if len(words) >= 2:
-        phrases.append(words[-2])
-    if len(words) >= 3:
-        phrases.append(words[-3])
+    if count >= 1:
+        ranges.append((count - 1, count))
+    if count >= 2:
+        ranges.append((count - 2, count - 1))
+    if count >= 3:
+        ranges.append((count - 3, count - 2))
         
-    return phrases
+    return ranges
+
+def split_text_for_address(text : str | TokenStream):
+    """
+    Split text into words and phrases for address matching
+    """
+    stream = text if isinstance(text, TokenStream) else TokenStream(text)
+    return [stream.phrase(first, last) for first, last in address_ranges(len(stream))]
     
-def split_text_for_prefix(text : str, result : tuple[int, str, str, int]):
+def split_text_for_prefix(text : str | TokenStream, result : tuple[int, str, str, int]):
     """
     Split text into words and phrases for address matching
     """
-    idx = (len(text) - 1 - result[0] - len(result[2]))
+    stream = text if isinstance(text, TokenStream) else TokenStream(text)
+    idx = (len(stream.raw) - 1 - result[0] - len(result[2]))
     if idx < 0:
         return []
-    return split_text_for_address(text[:idx])
+    # các token nằm trọn trong text[:idx]
+    count = stream.count_until(idx)
+    return [stream.phrase(first, last) for first, last in address_ranges(count)]
 
 
 def prefix_checker(
     results,
-    text : str,
+    text : str | TokenStream,
     prefix_dict : dict[str, list[str]],
     address_type : Literal["provinces", "districts", "wards"]
 ): 
+    stream = text if isinstance(text, TokenStream) else TokenStream(text)
     prefix_outputs = []
     for result in results:
-        words_for_prefix_check = split_text_for_prefix(text, result)
+        words_for_prefix_check = split_text_for_prefix(stream, result)
         raw, prefix, _ = prefix_helper(words_for_prefix_check, prefix_dict, address_type)
         prefix_outputs.append((result[0], result[1], prefix, f"{raw} {result[2]}".strip()))
         
@@ -287,17 +508,28 @@ def bktree_find(
         preprocess, 
         address_type : Literal["provinces", "districts", "wards"]
     ) -> list[tuple[int, str, str, str]]:
+    stream = TokenStream(text)
+    ranges = address_ranges(len(stream))
+    phrases = [stream.phrase(first, last) for first, last in ranges]
+    # chỉ cần nhóm khoảng cách nhỏ nhất của dynamic_phrase_search, mọi cụm cùng một lần gọi
+    best_groups = bktree.nearest_phrases(phrases, preprocess)
+    return address_candidates(text, stream, ranges, phrases, best_groups, prefix_dict, address_type)
+
+def address_candidates(
+        text : str,
+        stream : TokenStream,
+        ranges : list[tuple[int, int]],
+        phrases : list[str],
+        best_groups : list[list[tuple[str, str, int]]],
+        prefix_dict : dict[str, list[str]],
+        address_type : Literal["provinces", "districts", "wards"]
+    ) -> list[tuple[int, str, str, str]]:
+    """bktree_find output from the best-distance group of each phrase"""
     results = []
-        
-    words_for_address_check = split_text_for_address(text)
-    for phrase in words_for_address_check:     
-        start_index = text.index(phrase)
-        end_index = start_index + len(phrase)
-        found = bktree.dynamic_phrase_search(phrase, preprocess)
-        if found:
-            group = groupby(found, key = lambda x: x[-1])
-            best_group = list(next(group)[1])
-            results.extend([(len(text) - end_index, core, phrase, dist) for _, core, dist in best_group])        
+    for (first, last), phrase, best_group in zip(ranges, phrases, best_groups):
+        # vị trí lấy từ token, không tìm lại phrase trong text
+        _, end_index = stream.raw_span(first, last)
+        results.extend([(len(text) - end_index, core, phrase, dist) for _, core, dist in best_group])
     
     if not results:
         return []
@@ -311,7 +543,67 @@ def bktree_find(
     results = list(unique.values())
     results = sorted(results, key=lambda x: (x[-1], -len(x[-2])))
     
-    return prefix_checker(results, text, prefix_dict, address_type)
+    return prefix_checker(results, stream, prefix_dict, address_type)
+
+def cdist_nearest_phrases(
+        bktree : BKTree,
+        phrases : list[str],
+        preprocess,
+        workers : int = 1,
+        chunk_size : int = 1024
+    ) -> list[list[tuple[str, str, int]]]:
+    """
+    nearest_phrase_search of every phrase, scoring the distinct queries against
+    every word of bktree with rapidfuzz.process.cdist (workers threads, -1 = all
+    cores) instead of walking the tree. Queries are scored chunk_size at a time
+    to bound the (queries x words) matrix. Requires numpy (optional dependency).
+    """
+    import numpy as np
+    from rapidfuzz.distance import Levenshtein as RapidLevenshtein
+    from rapidfuzz.process import cdist
+
+    if not bktree.words:
+        return [[] for _ in phrases]
+    bktree.compact()
+    words, cores = bktree.words, bktree.cores
+
+    queries = [bktree.phrase_query(phrase, preprocess) for phrase in phrases]
+    unique = list(dict.fromkeys(query for query in queries if query))
+    found: dict[tuple[str, int], list[tuple[str, str, int]]] = {}
+    for start in range(0, len(unique), chunk_size):
+        chunk = unique[start : start + chunk_size]
+        # khoảng cách > cutoff được trả về là cutoff + 1
+        scores = cdist(
+            [query for query, _ in chunk], words,
+            scorer=RapidLevenshtein.distance,
+            score_cutoff=max(bound for _, bound in chunk),
+            dtype=np.uint8,
+            workers=workers,
+        )
+        for query, row in zip(chunk, scores):
+            distance = int(row.min())
+            # chỉ số tăng dần = thứ tự node trong cây, giống search_topk
+            nodes = np.flatnonzero(row == distance) if distance <= query[1] else ()
+            found[query] = nearest_order([(words[node], cores[node], distance) for node in nodes])
+    return [found[query] if query else [] for query in queries]
+
+def bktree_find_batch(
+        texts : list[str],
+        bktree : BKTree,
+        prefix_dict : dict[str, list[str]],
+        preprocess,
+        address_type : Literal["provinces", "districts", "wards"],
+        workers : int = 1
+    ) -> list[list[tuple[int, str, str, str]]]:
+    """bktree_find of every text, the phrases of all texts scored together by cdist_nearest_phrases"""
+    streams = [TokenStream(text) for text in texts]
+    all_ranges = [address_ranges(len(stream)) for stream in streams]
+    all_phrases = [[stream.phrase(first, last) for first, last in ranges] for stream, ranges in zip(streams, all_ranges)]
+    best_groups = iter(cdist_nearest_phrases(bktree, [phrase for phrases in all_phrases for phrase in phrases], preprocess, workers))
+    return [
+        address_candidates(text, stream, ranges, phrases, [next(best_groups) for _ in phrases], prefix_dict, address_type)
+        for text, stream, ranges, phrases in zip(texts, streams, all_ranges, all_phrases)
+    ]
         
             
 def split_text_for_address_v1(text : str, prefix : tuple[str, str]):
@@ -0,0 +1,157 @@
+"""
+Result caches of the address pipeline.
+
+Keys are (data version, preprocessed input): answers of an older gazetteer are
+never returned, and inputs differing only in what preprocess_input removes
+share one entry.
+
+ResultCache lives in memory; SQLiteResultCache persists results in a SQLite
+file (WAL mode) shared by every process using the same path and kept across
+restarts.
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+MISSING = object()
+
+
+class ResultCache:
+    """Thread-safe LRU cache of at most maxsize entries with hit / miss / eviction counters"""
+    def __init__(self, maxsize: int = 10_000):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SQLiteResultCache:
+    """
+    Persistent result store, one row per (version, input) key.
+    Values are stored as JSON, a stored list is returned as a tuple.
+    WAL mode: readers in any process never block on the writer.
+    """
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        # sqlite3.Connection không dùng chung giữa các thread -> một connection mỗi thread,
+        # giữ lại tất cả để close() đóng được connection của mọi thread
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        # connection của thread đã bị close() đóng -> mở lại
+        if connection is None or self._local.generation != self._generation:
+            # check_same_thread=False chỉ để close() đóng được từ thread khác
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "version TEXT NOT NULL, input TEXT NOT NULL, result TEXT NOT NULL, "
+                "PRIMARY KEY (version, input)) WITHOUT ROWID"
+            )
+            with self._lock:
+                self._connections.append(connection)
+                self._local.generation = self._generation
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: tuple[str, str], default: Any = MISSING) -> Any:
+        row = self.connection.execute(
+            "SELECT result FROM results WHERE version = ? AND input = ?", key
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return default
+        value = json.loads(row[0])
+        return tuple(value) if isinstance(value, list) else value
+
+    def put(self, key: tuple[str, str], value: Any):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (version, input, result) VALUES (?, ?, ?)",
+            (*key, json.dumps(value, ensure_ascii=False)),
+        )
+        with self._lock:
+            self.writes += 1
+
+    def prune(self, version: str) -> int:
+        """Delete the rows of every other version, returns the number of deleted rows"""
+        return self.connection.execute("DELETE FROM results WHERE version != ?", (version,)).rowcount
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        """Close the connection of every thread, a later call opens a new one"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for connection in connections:
+            connection.close()
+        self._local.connection = None
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -35,7 +35,7 @@ def get_prefix_dict():
         temp = set()
         [temp.add(get_abbreviation(e)) for e in v]
         [temp.add(get_abbreviation(e, " ")) for e in v]
-        abbreviation[k] = list(temp)
+        abbreviation[k] = sorted(temp)
   
     return {
         "full" : {
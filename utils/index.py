@@ -0,0 +1,192 @@
+"""
+Lazy index resources.
+
+AddressIndex loads (from the snapshot) or builds each automaton / BK-tree
+only when it is first used, so importing the pipeline costs nothing and an
+index restricted to provinces never materializes the 7,900 wards.
+"""
+
+import threading
+from collections.abc import Mapping
+from functools import cached_property
+from typing import Any, Callable, Iterable, Literal
+
+from utils.cache import MISSING, ResultCache, SQLiteResultCache
+from utils.snapshot import DATA_KEYS, SNAPSHOT_PATH, Snapshot, build_parts, data_version, read_snapshot
+from utils.trie import VIEWS, AddressAutomaton, build_automaton
+
+
+class LazyMapping(Mapping):
+    """Read-only mapping whose values are created by factory(key) on first access"""
+    def __init__(self, keys: Iterable[str], factory: Callable[[str], Any]):
+        self._keys = tuple(keys)
+        self._factory = factory
+        self._values: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str):
+        if key in self._values:
+            return self._values[key]
+        if key not in self._keys:
+            raise KeyError(key)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = self._factory(key)
+        return self._values[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def loaded(self) -> list[str]:
+        return list(self._values)
+
+
+class AddressIndex:
+    """
+    Index resources for the address pipeline, materialized on first use.
+
+    - levels: which of provinces / districts / wards can be loaded
+    - views: which automaton views (normalized / diacritics / nospace) can be loaded; the
+      trie stages of the views left out are skipped
+    - snapshot_path: prebuilt snapshot to load from, None to always build
+    - cache_size: keep the results of that many preprocessed inputs (LRU), 0 to disable
+    - cache_path: SQLite file persisting every result (shared by processes, kept across
+      restarts), None to disable; checked after the in-memory cache
+    - fuzzy: "bktree", "symspell" to answer BK-tree lookups within distance 2 from a
+      symmetric delete index (utils.symspell) built over each loaded tree, or "qgram" to
+      answer them from a q-gram inverted index (utils.qgram); same results
+    - typo_levels: levels whose names are also matched with one dropped / doubled / swapped
+      letter by an edit-1 automaton (utils.typo) before the BK-tree, none by default
+    """
+    def __init__(
+        self,
+        levels: Iterable[str] = DATA_KEYS,
+        views: Iterable[str] = VIEWS,
+        snapshot_path: str | None = SNAPSHOT_PATH,
+        cache_size: int = 0,
+        cache_path: str | None = None,
+        fuzzy: Literal["bktree", "symspell", "qgram"] = "bktree",
+        typo_levels: Iterable[str] = (),
+    ):
+        if fuzzy not in ("bktree", "symspell", "qgram"):
+            raise ValueError(f"unknown fuzzy backend {fuzzy!r}")
+        self.levels = tuple(level for level in DATA_KEYS if level in tuple(levels))
+        self.views = tuple(view for view in VIEWS if view in tuple(views))
+        self.snapshot_path = snapshot_path
+        self.cache = ResultCache(cache_size) if cache_size else None
+        self.store = SQLiteResultCache(cache_path) if cache_path else None
+        self.fuzzy = fuzzy
+        self.typo_levels = tuple(level for level in self.levels if level in tuple(typo_levels))
+        self._lock = threading.Lock()
+
+        self.bktree = LazyMapping(self.levels, self._load_fuzzy)
+
+    @cached_property
+    def automaton(self) -> AddressAutomaton:
+        # một automaton cho mọi view và cấp, automaton[view] là handle để quét
+        return self._load("automaton")
+
+    @cached_property
+    def typo(self):
+        """Edit-1 typo automaton of typo_levels (utils.typo.TypoAutomaton), None when disabled"""
+        if not self.typo_levels:
+            return None
+        from utils.typo import build_typo_automaton
+        return build_typo_automaton(self.data, self.typo_levels)
+
+    @cached_property
+    def prefix(self) -> dict:
+        from utils.data import get_prefix_dict
+        return get_prefix_dict()
+
+    @cached_property
+    def version(self) -> str:
+        return data_version(self.prefix)
+
+    @cached_property
+    def result_version(self) -> str:
+        """Data version + loaded levels / views (+ typo levels): results of an index restricted to some levels differ"""
+        version = f"{self.version}:{','.join(self.levels)}:{','.join(self.views)}"
+        return f"{version}:typo={','.join(self.typo_levels)}" if self.typo_levels else version
+
+    @cached_property
+    def snapshot(self) -> Snapshot | None:
+        if not self.snapshot_path:
+            return None
+        return read_snapshot(self.snapshot_path, self.version)
+
+    @cached_property
+    def data(self) -> dict[str, list[str]]:
+        with self._lock:
+            if self.snapshot is not None and "data" in self.snapshot:
+                data = self.snapshot.get("data")
+            else:
+                from utils.data import get_data
+                data = get_data()
+        return {level: data[level] for level in self.levels}
+
+    def _load(self, name: str):
+        # automaton trong snapshot chứa đủ các cấp và view, chỉ dùng được khi index load đủ
+        reusable = (self.levels == DATA_KEYS and self.views == VIEWS) or name != "automaton"
+        with self._lock:
+            if reusable and self.snapshot is not None and name in self.snapshot:
+                return self.snapshot.get(name)
+        return self._build(name)
+
+    def _load_fuzzy(self, level: str):
+        tree = self._load(f"bktree.{level}")
+        if self.fuzzy == "symspell":
+            from utils.symspell import DeleteIndex
+            return DeleteIndex(tree)
+        if self.fuzzy == "qgram":
+            from utils.qgram import QGramTree
+            return QGramTree(tree)
+        return tree
+
+    def _build(self, name: str):
+        if name == "automaton":
+            return build_automaton(self.data, self.prefix, self.views)
+        return build_parts([name], self.data, self.prefix)[name]
+
+    def loaded(self) -> list[str]:
+        """Names of the parts materialized so far"""
+        parts = ["automaton"] if "automaton" in self.__dict__ else []
+        parts += [f"bktree.{level}" for level in self.bktree.loaded()]
+        return parts + ["typo"] if self.__dict__.get("typo") is not None else parts
+
+    def process(self, input: str):
+        from utils.input import preprocess_input
+        from utils.trie_pipeline_v2 import full_pipeline
+
+        processed = preprocess_input(input)
+        if self.cache is None and self.store is None:
+            return full_pipeline(processed, self.automaton, self.bktree, self.typo)
+
+        # version: kết quả của gazetteer cũ không bao giờ được trả lại
+        key = (self.result_version, processed)
+        result = self.cache.get(key) if self.cache is not None else MISSING
+        if result is MISSING and self.store is not None:
+            result = self.store.get(key)
+            if result is not MISSING and self.cache is not None:
+                self.cache.put(key, result)
+        if result is MISSING:
+            result = full_pipeline(processed, self.automaton, self.bktree, self.typo)
+            if self.cache is not None:
+                self.cache.put(key, result)
+            if self.store is not None:
+                self.store.put(key, result)
+        return result
+
+    def cache_stats(self) -> dict[str, int | float] | None:
+        """Hit / miss / eviction counters of the result cache, None when it is disabled"""
+        return self.cache.stats() if self.cache is not None else None
+
+    def store_stats(self) -> dict[str, int | float] | None:
+        """Hit / miss / write counters of the persistent store, None when it is disabled"""
+        return self.store.stats() if self.store is not None else None
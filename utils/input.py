@@ -43,18 +43,25 @@ def sort_dict(d: dict[str, list], reverse = False) -> dict[str, list]:
 ALIAS_MAP = sort_dict(ALIAS_SINGLE_MAP)
 ALIAS_PLACE = sort_dict(ALIAS_PLACE)
 
-import re
+SPACE_PATTERN = re.compile(r"\s+")
+
+# normalize_input
+COMMA_PATTERN = re.compile(r",\s*")
+LOWER_UPPER_PATTERN = re.compile(r"([a-zđ])([A-ZĐ])")
+INNER_DIGIT_PATTERN = re.compile(r"(?<![qp])(?<=[^\d\s])\d(?=[^\d\s])", re.IGNORECASE)
+LETTER_DIGIT_PATTERN = re.compile(r"(?<=[a-zA-Zà-ỹđĐ])(?=\d)|(?<=\d)(?=[a-zA-Zà-ỹđĐ])")
+DOT_PATTERN = re.compile(r"\.\s*")
 
 def normalize_input(s: str) -> str:
     """Chuẩn hóa input: lowercase, space hợp lý, tách số và chữ."""
     s = s.strip()
-    s = re.sub(r",\s*", ", ", s)                 
-    s = re.sub(r"([a-zđ])([A-ZĐ])", r"\1 \2", s)
-    s = re.sub(r"(?<![qp])(?<=[^\d\s])\d(?=[^\d\s])", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"(?<=[a-zA-Zà-ỹđĐ])(?=\d)|(?<=\d)(?=[a-zA-Zà-ỹđĐ])", " ", s)
-    s = re.sub(r"\.\s*", ". ", s)                  
-    s = re.sub(r"\s+", " ", s)   
-             
+    s = COMMA_PATTERN.sub(", ", s)
+    s = LOWER_UPPER_PATTERN.sub(r"\1 \2", s)
+    s = INNER_DIGIT_PATTERN.sub("", s)
+    s = LETTER_DIGIT_PATTERN.sub(" ", s)
+    s = DOT_PATTERN.sub(". ", s)
+    s = SPACE_PATTERN.sub(" ", s)
+
     return s.lower().strip()
 
 
@@ -75,35 +82,37 @@ def build_multi_rules(alias : dict) :
     for replacement, aliases in alias.items():
         pattern_dict[replacement + " "] = r'\b(?:' + '|'.join(map(re.escape, aliases)) + r')'
     return pattern_dict
-        
+
+def compile_rules(rules : dict[str, str]) -> list[tuple[re.Pattern, str]]:
+    return [(re.compile(pattern, re.IGNORECASE), replace) for replace, pattern in rules.items()]
+
+# Xử lý riêng cho "f." special case
+F_DOT_PATTERN = re.compile(r'(?:^|\s)f\.(?=\s|$)', re.IGNORECASE)
+
+# Rule của replace_alias, compile một lần lúc import, áp dụng theo thứ tự từng phase.
+# Khoảng trắng chỉ được gộp một lần sau mỗi phase: với input đã qua normalize_input,
+# khoảng trắng thừa chỉ nằm sát phần vừa thay thế nên không đổi kết quả các rule sau
+ALIAS_PHASES = [
+    compile_rules(build_single_rules(ALIAS_SINGLE_MAP)),
+    compile_rules(build_abbreviation_rules(ALIAS_ABBREV_MAP)),
+    compile_rules(build_multi_rules(ALIAS_MULTI_MAP)),
+    compile_rules(build_single_rules(ALIAS_PLACE)),
+]
+
 def replace_alias(text : str):
-    result = text
-    
-    # Xử lý riêng cho "f." special case
-    result = re.sub(r'(?:^|\s)f\.(?=\s|$)', ' phường ', result, flags=re.IGNORECASE)
-    
-    single_rules = build_single_rules(ALIAS_SINGLE_MAP)
-    abbreviation_rules = build_abbreviation_rules(ALIAS_ABBREV_MAP)
-    multi_rules = build_multi_rules(ALIAS_MULTI_MAP)
-    rules_place = build_single_rules(ALIAS_PLACE)
-    
-    for replace, pattern in single_rules.items():
-        result = re.sub(pattern, replace, result, flags=re.IGNORECASE)
-        result = re.sub(r"\s+", " ", result)         
-    
-    for replace, pattern in abbreviation_rules.items():
-        result = re.sub(pattern, replace, result, flags=re.IGNORECASE)
-        result = re.sub(r"\s+", " ", result)              
-            
-    for replace, pattern in multi_rules.items():
-        result = re.sub(pattern, replace, result, flags=re.IGNORECASE)
-        result = re.sub(r"\s+", " ", result)   
-                       
-    for replace, pattern in rules_place.items():
-        result = re.sub(pattern, replace, result, flags=re.IGNORECASE)  
-    
-    result = re.sub(r"\s+", " ", result).strip()
-    return result
+    """Expand aliases of a normalize_input output"""
+    return replace_alias_batch([text])[0]
+
+def replace_alias_batch(texts : list[str]) -> list[str]:
+    """replace_alias over a list of strings, each compiled rule runs over the whole list in turn"""
+    results = [F_DOT_PATTERN.sub(' phường ', text) for text in texts]
+
+    for rules in ALIAS_PHASES:
+        for pattern, replace in rules:
+            results = [pattern.sub(replace, result) for result in results]
+        results = [SPACE_PATTERN.sub(" ", result) for result in results]
+
+    return [result.strip() for result in results]
 
 def add_comma_before_administrative(text: str) -> str:
     """Thêm dấu phẩy trước các từ administrative."""
@@ -114,11 +123,13 @@ def add_comma_before_administrative(text: str) -> str:
     text = re.sub(rf'({administrative_terms})\s*,\s*', r'\1 ', text)
     return text
 
+SHORT_NUMBER_PATTERN = re.compile(r"(?<!quận\s)(?<!phường\s)\b\d{1,2}\b", re.IGNORECASE)
+
 def final_normalize(s:str):
     # Bỏ số 1-2 chữ số không đứng sau "quận" hoặc "phường"
-    s = re.sub(r"(?<!quận\s)(?<!phường\s)\b\d{1,2}\b", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"\.", " ", s)      
-    s = re.sub(r"\s+", " ", s)      
+    s = SHORT_NUMBER_PATTERN.sub("", s)
+    s = s.replace(".", " ")
+    s = SPACE_PATTERN.sub(" ", s)
     return s.strip()
 
 def partial_select(input:str):
@@ -136,6 +147,11 @@ def preprocess_input(text: str) -> str:
     # text = partial_select(text)
     return text
 
+def preprocess_input_batch(texts: list[str]) -> list[str]:
+    """preprocess_input over a list of strings"""
+    texts = replace_alias_batch([normalize_input(text) for text in texts])
+    return [final_normalize(text) for text in texts]
+
 def select_candidate_by_order_administrative(candidates, input: str):
     if len(candidates) == 1:
         return candidates
@@ -23,9 +23,45 @@ from utils.process_save import (
     ALIAS_ABBREV_WITHOUT_DOT_REGEX_MAP,
     ALIAS_ABBREV_WITHOUT_DOT_WITH_COMMA_SPACE_REGEX_MAP, 
     ALIAS_LONG_REGEX_MAP,
-    ALIAS_PLACE_REGEX_MAP
+    ALIAS_PLACE_REGEX_MAP,
+    ALIAS_ABBREV_MAP, ALIAS_LONG_MAP, ALIAS_PLACE,
 )
 
+# İ / ı khớp với i khi IGNORECASE nhưng lower() không ra i
+WORD_FOLD = str.maketrans("İı", "ii")
+
+def word_key(word : str):
+    word = word.translate(WORD_FOLD).lower()
+    # q12 / p3 / f3: key chung cho viết tắt kèm số
+    return word[0] + "#" if word[-1].isdigit() else word
+
+def alias_rules(regex_map : dict, alias_map : dict):
+    return [
+        (pattern, repl, frozenset(word_key(re.match(r"\w+", alias).group()) for alias in alias_map[repl]))
+        for repl, pattern in regex_map.items()
+    ]
+
+# Các rule của expand_abbreviation theo đúng thứ tự áp dụng: (pattern, repl, từ kích hoạt).
+# Mọi match của một rule đều bắt đầu bằng một từ trọn vẹn (\w+) nằm trong tập kích hoạt,
+# nên rule nào không có từ kích hoạt trong chuỗi hiện tại thì chắc chắn không khớp.
+ALIAS_RULES = [
+    (__EXPAND_DISTRICT_WITH_NUMBERS__PATTERN__, __EXPAND_DISTRICT_WITH_NUMBERS__REPLACE__, frozenset({"q#"})),
+    (__EXPAND_WARD_WITH_NUMBERS__PATTERN__, __EXPAND_WARD_WITH_NUMBERS__REPLACE__, frozenset({"p#", "f#"})),
+    *alias_rules(ALIAS_PLACE_REGEX_MAP, ALIAS_PLACE),
+    *alias_rules(ALIAS_ABBREV_WITH_DOT_REGEX_MAP, ALIAS_ABBREV_MAP),
+    *alias_rules(ALIAS_ABBREV_WITHOUT_DOT_WITH_COMMA_SPACE_REGEX_MAP, ALIAS_ABBREV_MAP),
+    *alias_rules(ALIAS_ABBREV_WITHOUT_DOT_REGEX_MAP, ALIAS_ABBREV_MAP),
+    *alias_rules(ALIAS_LONG_REGEX_MAP, ALIAS_LONG_MAP),
+]
+TRIGGER_WORDS = frozenset().union(*(triggers for _, _, triggers in ALIAS_RULES))
+TRIGGER_PATTERN = re.compile(
+    rf"\b(?:{'|'.join(map(re.escape, sorted(TRIGGER_WORDS - {'q#', 'p#', 'f#'}, key=len, reverse=True)))}|[qpf]\d{{1,2}})\b",
+    re.IGNORECASE
+)
+
+def trigger_words(text : str):
+    return {word_key(match.group()) for match in TRIGGER_PATTERN.finditer(text)}
+
 @track_input("text")
 def general_process_input(text :  str):
     input = text
@@ -62,23 +98,20 @@ def final_clean(text :  str):
 
 @track_input("text")
 def expand_abbreviation(text : str):
-    input = __EXPAND_DISTRICT_WITH_NUMBERS__PATTERN__.sub(__EXPAND_DISTRICT_WITH_NUMBERS__REPLACE__, text)
-    input = __EXPAND_WARD_WITH_NUMBERS__PATTERN__.sub(__EXPAND_WARD_WITH_NUMBERS__REPLACE__, input)
-    for repl, pattern in ALIAS_PLACE_REGEX_MAP.items():
-        input = pattern.sub(repl, input)
-    
-    for repl, pattern in ALIAS_ABBREV_WITH_DOT_REGEX_MAP.items():
-        input = pattern.sub(repl, input)
-    
-    for repl, pattern in ALIAS_ABBREV_WITHOUT_DOT_WITH_COMMA_SPACE_REGEX_MAP.items():
-        input = pattern.sub(repl, input)
-    
-    for repl, pattern in ALIAS_ABBREV_WITHOUT_DOT_REGEX_MAP.items():
-        input = pattern.sub(repl, input)
-        
-    for repl, pattern in ALIAS_LONG_REGEX_MAP.items():
-        input = pattern.sub(repl, input)
-    
+    """
+    Apply ALIAS_RULES in order. One scan collects the trigger words of the text,
+    then only rules with a trigger present run; the scan is redone after each
+    rewrite since an output can feed a later rule ("t. phố" -> "tỉnh phố" -> "thành phố").
+    """
+    input = text
+    words = trigger_words(input)
+    for pattern, repl, triggers in ALIAS_RULES:
+        # từ ngoài TRIGGER_WORDS (case folding lạ): không bỏ qua rule nào
+        if triggers.isdisjoint(words) and words <= TRIGGER_WORDS:
+            continue
+        input, count = pattern.subn(repl, input)
+        if count:
+            words = trigger_words(input)
     return input
 
 @track_time_ns
@@ -1,41 +1,138 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Các hàm chuẩn hóa dùng bảng str.translate thay vì duyệt từng ký tự bằng unicodedata.
+# Bảng được dựng sẵn cho bảng chữ cái tiếng Việt, ký tự khác được tính ở lần gặp đầu tiên.
+# Ký tự không xử lý được theo từng ký tự (chữ số ngoài ASCII, dấu kết hợp không phải Mn)
+# được map thành EXOTIC và cả chuỗi (với to_normalized*: cả token) đi qua bản cài đặt cũ
+# (*_slow) -> kết quả giữ nguyên.
+#
+# to_normalized* chuẩn hóa từng token (tách theo khoảng trắng) qua cache LRU: ký tự phân tách
+# chỉ tách thêm chứ không nối token, số chỉ nằm trong một token -> ghép các token = chuẩn hóa cả chuỗi.
+# Địa chỉ dùng lại một bộ từ nhỏ ("phường", "quận", "tp", "hồ", ...) nên phần lớn là tra dict.
+
+EXOTIC = "\x00"
+VIETNAMESE_ALPHABET = "".join(
+    unicodedata.normalize("NFC", base + tone).upper() + unicodedata.normalize("NFC", base + tone)
+    for base in "aăâbcdđeêghiklmnoôơpqrstuưvxyfjwz"
+    for tone in ("", "\u0300", "\u0301", "\u0309", "\u0303", "\u0323")
+    if len(unicodedata.normalize("NFC", base + tone)) == 1
+) + "0123456789 ,.-/\t\n"
+
+
+class TranslationTable(dict):
+    """str.translate table, chars missing from the precomputed alphabet are mapped on first use"""
+    def __init__(self, mapper, alphabet: str = VIETNAMESE_ALPHABET):
+        super().__init__()
+        self.mapper = mapper
+        for ch in alphabet:
+            self[ord(ch)] = mapper(ch)
+
+    def __missing__(self, key: int):
+        value = self.mapper(chr(key))
+        self[key] = value
+        return value
+
+
+def normalized_char(separators: str):
+    def mapper(ch: str) -> str | None:
+        if ch in separators:
+            return " "  # thay bằng khoảng trắng
+        if ch.isdigit():
+            # chữ số ngoài ASCII: int() / isdigit của bản cũ khác regex -> đi đường cũ
+            return ch if "0" <= ch <= "9" else EXOTIC
+        if unicodedata.category(ch).startswith("L") or ch.isspace():
+            return ch
+        return None  # ký tự khác thì bỏ qua
+    return mapper
+
+
+def diacritics_char(ch: str) -> str:
+    decomp = unicodedata.normalize("NFD", ch)
+    # dấu kết hợp không phải Mn có thể bị sắp xếp lại khi NFD cả chuỗi -> đi đường cũ
+    if any(unicodedata.combining(c) and unicodedata.category(c) != "Mn" for c in decomp):
+        return EXOTIC
+    return "".join(c for c in decomp if unicodedata.category(c) != "Mn").replace("đ", "d")
+
+
+def no_diacritics_char(ch: str) -> str:
+    # nếu ký tự gốc có dấu (có Mn đi kèm) thì bỏ luôn
+    decomp = unicodedata.normalize("NFD", ch)
+    return "" if any(unicodedata.category(c) == "Mn" for c in decomp) else ch
+
+
+NORMALIZED_TABLE = TranslationTable(normalized_char(",.-/"))
+NORMALIZED_NO_COMMA_TABLE = TranslationTable(normalized_char(".-/"))
+DIACRITICS_TABLE = TranslationTable(diacritics_char)
+NO_DIACRITICS_TABLE = TranslationTable(no_diacritics_char)
+# số có từ 3 chữ số, hoặc 2 chữ số lớn hơn 61 thì bỏ
+INVALID_NUMBER = re.compile(r"(?<![0-9])(?:[0-9]{3,}|6[2-9]|[7-9][0-9])(?![0-9])")
+
+
+# số token tối đa được cache cho mỗi hàm chuẩn hóa
+TOKEN_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def normalized_token(token: str) -> str:
+    """to_normalized of one token without whitespace (may be empty or several words)"""
+    text = token.lower().translate(NORMALIZED_TABLE)
+    if EXOTIC in text:
+        return to_normalized_slow(token)
+    # gom lại, loại bớt khoảng trắng thừa
+    return " ".join(INVALID_NUMBER.sub("", text).split())
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def normalized_no_comma_token(token: str) -> str:
+    text = token.lower().translate(NORMALIZED_NO_COMMA_TABLE)
+    if EXOTIC in text:
+        return to_normalized_slow(token, ".-/")
+    return " ".join(INVALID_NUMBER.sub("", text).split())
+
 def to_normalized(address: str):
-    import unicodedata
+    return " ".join(filter(None, map(normalized_token, address.split())))
 
-    address = address.lower()
-    res = []
-    number = []
+def to_normalized_no_comma_deleted(address: str):
+    return " ".join(filter(None, map(normalized_no_comma_token, address.split())))
+
+def normalization_cache_info() -> dict[str, dict[str, int | float]]:
+    """Hits / misses / size of the token caches, hit_rate = hits / lookups"""
+    stats = {}
+    for name, cached in (("normalized", normalized_token), ("normalized_no_comma", normalized_no_comma_token)):
+        info = cached.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+        }
+    return stats
+
+def clear_normalization_cache():
+    normalized_token.cache_clear()
+    normalized_no_comma_token.cache_clear()
 
-    def flush_number():
-        """Đưa số ra res nếu hợp lệ, ngược lại bỏ qua"""
-        nonlocal number
-        if number:
-            num_str = "".join(number)
-            if len(num_str) < 3 and not (len(num_str) == 2 and int(num_str) > 61):
-                res.append(num_str)
-            number = []
+def to_diacritics(address : str) :
+    if address.isascii():
+        return address
+    text = address.translate(DIACRITICS_TABLE)
+    if EXOTIC in text:
+        return to_diacritics_slow(address)
+    return text
 
-    for ch in address:
-        if ch in {",", ".", "-", "/"}:
-            flush_number()
-            res.append(" ")  # thay bằng khoảng trắng
-        elif ch.isdigit():
-            number.append(ch)
-        else:
-            cat = unicodedata.category(ch)
-            if cat.startswith("L") or ch.isspace():
-                flush_number()
-                res.append(ch)
-            # ký tự khác thì bỏ qua
+# Only apply for building automaton (not input)
+def to_nospace(address : str):
+    return address.replace(" ", "")
 
-    # xử lý nếu kết thúc bằng số
-    flush_number()
 
-    # gom lại, loại bớt khoảng trắng thừa
-    return " ".join("".join(res).split())
+def remove_diacritics(s: str) -> str:
+    return s.translate(NO_DIACRITICS_TABLE)
 
-def to_normalized_no_comma_deleted(address: str):
-    import unicodedata
 
+def to_normalized_slow(address: str, separators: str = ",.-/"):
     address = address.lower()
     res = []
     number = []
@@ -50,7 +147,7 @@ def to_normalized_no_comma_deleted(address: str):
             number = []
 
     for ch in address:
-        if ch in {".", "-", "/"}:
+        if ch in separators:
             flush_number()
             res.append(" ")  # thay bằng khoảng trắng
         elif ch.isdigit():
@@ -68,29 +165,11 @@ def to_normalized_no_comma_deleted(address: str):
     # gom lại, loại bớt khoảng trắng thừa
     return " ".join("".join(res).split())
 
-def to_diacritics(address : str) :
-    import unicodedata
+def to_diacritics_slow(address : str) :
     nfkd_form = unicodedata.normalize('NFD', address)
     nfkd_form = ''.join([c for c in nfkd_form if unicodedata.category(c) != 'Mn'])
     return nfkd_form.replace("đ", "d")
 
-# Only apply for building automaton (not input)
-def to_nospace(address : str):
-    return address.replace(" ", "")
-
-
-def remove_diacritics(s: str) -> str:
-    import unicodedata
-    res = []
-    for ch in s:
-        # tách NFD để xem ký tự này có dấu không
-        decomp = unicodedata.normalize("NFD", ch)
-        # nếu ký tự gốc có dấu (có Mn đi kèm) thì bỏ luôn
-        if any(unicodedata.category(c) == "Mn" for c in decomp):
-            continue
-        res.append(ch)
-    return "".join(res)
-
 def normalize_input(address_input):
     """
     Normalize Vietnamese address input for consistent parsing.
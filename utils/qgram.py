@@ -0,0 +1,163 @@
+"""
+Character q-gram inverted index for fuzzy candidate generation.
+
+Every word is split into its q-grams, padded with q - 1 markers on each side
+so short words still have grams. One edit destroys at most q grams, so two
+words within Levenshtein distance k share at least
+max(len(a), len(b)) + q - 1 - k * q grams (count filter) and differ in
+length by at most k (length filter). Only the words sharing enough grams
+with the query, found from the posting lists of its grams, reach the exact
+Levenshtein check, instead of the whole dictionary.
+"""
+
+from collections import Counter
+
+import Levenshtein
+
+from utils.bktree import BKTree
+
+PAD = "\x00"
+
+
+def grams(word: str, q: int = 2) -> list[str]:
+    """Padded q-grams of word, in order (with repeats)"""
+    padded = PAD * (q - 1) + word + PAD * (q - 1)
+    return [padded[i : i + q] for i in range(len(padded) - q + 1)]
+
+
+class QGramIndex:
+    """
+    q-gram index over a list of words, word ids are their positions in the list.
+
+    candidates(word, k) is a superset of the ids within distance k of word,
+    search(word, k) keeps the ones that really are.
+    """
+    def __init__(self, words: list[str], q: int = 2):
+        self.q = q
+        self.words = list(words)
+        self.lengths = [len(word) for word in self.words]
+        # gram -> id của từ chứa gram, lặp lại theo số lần xuất hiện
+        self.postings: dict[str, list[int]] = {}
+        self.by_length: dict[int, list[int]] = {}
+        for index, word in enumerate(self.words):
+            for gram in grams(word, q):
+                self.postings.setdefault(gram, []).append(index)
+            self.by_length.setdefault(len(word), []).append(index)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _shared(self, word: str) -> Counter:
+        # số gram chung với mỗi id (cận trên của số gram chung tính theo multiset)
+        shared: Counter = Counter()
+        for gram in set(grams(word, self.q)):
+            shared.update(self.postings.get(gram, ()))
+        return shared
+
+    def candidates(self, word: str, max_distance: int) -> list[int]:
+        """Ids (ascending) passing the length and count filters for max_distance"""
+        if max_distance < 0:
+            return []
+        length, lengths = len(word), self.lengths
+        base = self.q - 1 - max_distance * self.q
+        if length + base <= 0:
+            # ngưỡng count <= 0: chỉ còn lọc theo độ dài
+            return sorted(
+                index
+                for size in range(max(0, length - max_distance), length + max_distance + 1)
+                for index in self.by_length.get(size, ())
+            )
+        # count >= length + base loại nhanh phần lớn id trước khi xét độ dài từ
+        return sorted(
+            index
+            for index, count in self._shared(word).items()
+            if count >= length + base and abs(lengths[index] - length) <= max_distance and count >= lengths[index] + base
+        )
+
+    def search(self, word: str, max_distance: int) -> list[tuple[int, int]]:
+        """(distance, id) of every word within max_distance of word, by id"""
+        words = self.words
+        hits = []
+        for index in self.candidates(word, max_distance):
+            distance = Levenshtein.distance(word, words[index], score_cutoff=max_distance)
+            if distance <= max_distance:
+                hits.append((distance, index))
+        return hits
+
+    def topk(self, word: str, k: int = 1, max_distance: int = 2) -> list[tuple[int, int]]:
+        """
+        (distance, id) sorted of the k nearest words within max_distance, with every
+        word tied with the k-th. Candidates are checked by decreasing shared gram
+        count and the bound drops to the k-th best distance found so far, which
+        also raises the count threshold of the remaining candidates.
+        """
+        if k <= 0 or max_distance < 0:
+            return []
+        words, lengths, q, length = self.words, self.lengths, self.q, len(word)
+        shared = self._shared(word)
+        minimum = length + q - 1 - max_distance * q
+        if minimum <= 0:
+            ranked = sorted((-shared.get(index, 0), index) for index in self.candidates(word, max_distance))
+        else:
+            ranked = sorted((-count, index) for index, count in shared.items() if count >= minimum)
+
+        bound = max_distance
+        hits: list[tuple[int, int]] = []
+        for negative_count, index in ranked:
+            count = -negative_count
+            base = q - 1 - bound * q
+            if count < length + base:
+                # các id còn lại có ít gram chung hơn
+                break
+            if abs(lengths[index] - length) > bound or count < lengths[index] + base:
+                continue
+            distance = Levenshtein.distance(word, words[index], score_cutoff=bound)
+            if distance <= bound:
+                hits.append((distance, index))
+                if len(hits) >= k:
+                    hits.sort()
+                    bound = hits[k - 1][0]
+        return sorted(hit for hit in hits if hit[0] <= bound)
+
+
+class QGramTree(BKTree):
+    """
+    BK-tree answering search / search_topk from a QGramIndex over its words,
+    with the same results (and order) as the tree. Node ids are the tree ids,
+    so ties keep the tree order.
+    """
+    def __init__(self, tree: BKTree, q: int = 2):
+        super().__init__(tree.tree_type)
+        tree.compact()
+        self.size = tree.size
+        self.words, self.cores = list(tree.words), list(tree.cores)
+        self.edge_start, self.edge_distance, self.edge_child = tree.edge_start[:], tree.edge_distance[:], tree.edge_child[:]
+        self._children = None
+        self.q = q
+        self.index = QGramIndex(self.words, q)
+
+    def compact(self):
+        # insert sau khi build: compact đánh lại id node -> dựng lại index
+        if self._children is not None:
+            super().compact()
+            self.index = QGramIndex(self.words, self.q)
+
+    def search(self, word: str, preprocess=None, max_distance: int = 2):
+        if not self.words or max_distance < 0:
+            return []
+        self.compact()
+
+        word = preprocess(word) if preprocess else word.lower()
+        hits = self.index.search(word, max_distance)
+        return sorted(((self.words[node], self.cores[node], distance) for distance, node in hits), key=lambda x: x[1])
+
+    def search_topk(self, word: str, k: int = 1, max_distance: int = 2, preprocess=None, ties: bool = False):
+        if not self.words or k <= 0 or max_distance < 0:
+            return []
+        self.compact()
+
+        query = preprocess(word) if preprocess else word.lower()
+        hits = self.index.topk(query, k, max_distance)
+        if not ties:
+            hits = hits[:k]
+        return [(self.words[node], self.cores[node], distance) for distance, node in hits]
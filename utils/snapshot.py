@@ -0,0 +1,205 @@
+"""
+Prebuilt index snapshot.
+
+A snapshot is a single file holding every structure the pipeline needs at
+startup (data lists, prefix dict, automata, BK-trees). Each structure is
+pickled into its own blob so a loader can unpickle only the parts it uses.
+
+Layout:
+    MAGIC | header size (8 bytes, little endian) | pickled header | blobs...
+
+The header stores the data version and the (offset, size) of every blob.
+The version is a content hash of the data files, the prefix tables and
+INDEX_FORMAT, so editing the gazetteer or the build logic invalidates it.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any
+
+MAGIC = b"ADDRIDX\x01"
+# Tăng khi thay đổi cách build automaton / BK-tree để snapshot cũ bị bỏ qua
+INDEX_FORMAT = 6
+DATA_KEYS = ("provinces", "districts", "wards")
+SNAPSHOT_PATH = "data/index.snapshot"
+
+
+def data_version(prefix_dict: dict, data_dir: str = "data") -> str:
+    """Content hash of the data files and prefix tables"""
+    digest = hashlib.sha256()
+    digest.update(f"format:{INDEX_FORMAT}".encode())
+    for key in DATA_KEYS:
+        with open(os.path.join(data_dir, f"{key}.txt"), "rb") as f:
+            digest.update(key.encode())
+            digest.update(f.read())
+    digest.update(json.dumps(prefix_dict, ensure_ascii=False, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def part_names(levels: tuple[str, ...] = DATA_KEYS) -> list[str]:
+    """Names of the automaton / BK-tree parts of a snapshot"""
+    return ["automaton"] + [f"bktree.{level}" for level in levels]
+
+
+def build_parts(names: list[str], data: dict[str, list[str]], prefix_dict: dict) -> dict[str, Any]:
+    """
+    Build the given parts over the levels of data.
+    Besides the snapshot parts, "entries.<view>" builds only the keys of one view
+    (see utils.trie.build_view_entries) so views can be built apart and merged.
+    """
+    from utils.bktree import build_bk_trees
+    from utils.preprocess import to_normalized
+    from utils.trie import build_automaton, build_view_entries
+
+    parts: dict[str, Any] = {}
+    for name in names:
+        kind, _, key = name.partition(".")
+        if kind == "automaton":
+            parts[name] = build_automaton(data, prefix_dict)
+        elif kind == "entries":
+            parts[name] = build_view_entries(data, prefix_dict, (key,))[key]
+        else:
+            parts[name] = build_bk_trees({key: data[key]}, prefix_dict["full"]["normalized"], to_normalized)[key]
+    return parts
+
+
+def timed_build_parts(names: list[str], data: dict[str, list[str]], prefix_dict: dict) -> tuple[dict[str, Any], float]:
+    start = time.perf_counter()
+    parts = build_parts(names, data, prefix_dict)
+    return parts, time.perf_counter() - start
+
+
+def build_index(prefix_dict: dict | None = None, workers: int | None = 1) -> tuple[dict[str, Any], dict[str, float]]:
+    """
+    Build every index structure from data/*.txt.
+
+    workers == 1 builds in this process (all automaton views in one pass),
+    otherwise the keys of every automaton view and every BK-tree are separate
+    tasks on a process pool of that size (None = os.cpu_count()), the views are
+    merged into the automaton afterwards. Returns the snapshot parts and the
+    build time in seconds of each task.
+    """
+    from utils.data import get_data, get_prefix_dict
+    from utils.trie import VIEWS, AddressAutomaton
+
+    data = get_data()
+    prefix_dict = prefix_dict or get_prefix_dict()
+    names = part_names()
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        tasks = [[name] for name in names]
+        results = [timed_build_parts(task, data, prefix_dict) for task in tasks]
+    else:
+        # automaton trước, BK-tree ward trước: task lâu nhất được chạy sớm nhất
+        tasks = [[f"entries.{view}"] for view in VIEWS] + [["bktree.wards"], ["bktree.districts"], ["bktree.provinces"]]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(timed_build_parts, tasks, repeat(data), repeat(prefix_dict)))
+
+    built: dict[str, Any] = {}
+    timings: dict[str, float] = {}
+    for task, (task_parts, seconds) in zip(tasks, results):
+        built.update(task_parts)
+        timings["+".join(task)] = seconds
+
+    if "automaton" not in built:
+        start = time.perf_counter()
+        built["automaton"] = AddressAutomaton({view: built.pop(f"entries.{view}") for view in VIEWS}, tuple(data))
+        timings["automaton"] = time.perf_counter() - start
+
+    parts: dict[str, Any] = {"data": data, "prefix": prefix_dict}
+    parts.update((name, built[name]) for name in names)
+    return parts, timings
+
+
+def write_snapshot(path: str, version: str, parts: dict[str, Any]):
+    """Write parts atomically (tmp file + rename) so concurrent readers never see a partial file"""
+    blobs = {name: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) for name, value in parts.items()}
+
+    # offset tính từ đầu vùng blob, header không phụ thuộc vào kích thước của chính nó
+    offsets, position = {}, 0
+    for name, blob in blobs.items():
+        offsets[name] = (position, len(blob))
+        position += len(blob)
+    header = pickle.dumps({"version": version, "parts": offsets}, protocol=pickle.HIGHEST_PROTOCOL)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for blob in blobs.values():
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view over a snapshot file"""
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not an index snapshot")
+
+        header_start = len(MAGIC) + 8
+        header_size = int.from_bytes(self._mmap[len(MAGIC) : header_start], "little")
+        header = pickle.loads(self._mmap[header_start : header_start + header_size])
+        self.version: str = header["version"]
+        self.parts: dict[str, tuple[int, int]] = header["parts"]
+        self._blob_start = header_start + header_size
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.parts
+
+    def get(self, name: str) -> Any:
+        offset, size = self.parts[name]
+        start = self._blob_start + offset
+        return pickle.loads(memoryview(self._mmap)[start : start + size])
+
+    def close(self):
+        self._mmap.close()
+
+
+def read_snapshot(path: str, version: str) -> Snapshot | None:
+    """Open the snapshot at path, None if it is missing, corrupt or built from other data"""
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+        return None
+    if snapshot.version != version:
+        snapshot.close()
+        return None
+    return snapshot
+
+
+def save_snapshot(path: str = SNAPSHOT_PATH, workers: int | None = 1) -> tuple[str, dict[str, float]]:
+    """Build the index from scratch and write it to path, returns the data version and build timings"""
+    from utils.data import get_prefix_dict
+
+    prefix_dict = get_prefix_dict()
+    version = data_version(prefix_dict)
+    parts, timings = build_index(prefix_dict, workers)
+    write_snapshot(path, version, parts)
+    return version, timings
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the address index snapshot")
+    parser.add_argument("path", nargs="?", default=SNAPSHOT_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size, 1 to build in-process (default: cpu count)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    version, timings = save_snapshot(args.path, args.workers)
+    for name, seconds in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        print(f"{seconds:8.3f} s  {name}")
+    print(f"Snapshot {args.path} ({version[:12]}) built in {time.perf_counter() - start:.2f} s")
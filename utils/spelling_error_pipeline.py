@@ -1,9 +1,10 @@
 import re
-import pandas as pd
 from typing import Any, Dict, List, Optional, Tuple, Set
 from fuzzywuzzy import fuzz
 import unicodedata
 
+from utils.qgram import QGramIndex
+
 def has_accents(s: str) -> bool:
         return any('WITH' in unicodedata.name(c, '') for c in s if c.isalpha())
 
@@ -23,8 +24,29 @@ def break_ties(candidates: List[str], original: str) -> str:
 def create_list(names: Set[str]) -> List[Tuple[str, str]]:
     return [(name.lower().replace(' ', ''), name) for name in names]
 
-
-def extract_address_components(text: str, data : dict[str, list[Any]]) -> Dict[str, str]:
+def create_index(reference_list: List[Tuple[str, str]]) -> QGramIndex:
+    """q-gram index over the condensed names of a create_list result, ids are list positions"""
+    return QGramIndex([cond_ref for cond_ref, _ in reference_list])
+
+def reference_matches(cond_cand: str, reference_list: List[Tuple[str, str]], index: QGramIndex, thresh: int) -> List[Tuple[str, int]]:
+    """(original, distance) of every entry of reference_list within thresh of cond_cand, in list order"""
+    # index (create_index của reference_list) thay cho việc tính Levenshtein với mọi entry
+    return [(reference_list[position][1], dist) for dist, position in index.search(cond_cand, thresh)]
+
+
+def create_tables(data: dict[str, list[Any]]) -> Dict[str, Tuple[List[Tuple[str, str]], QGramIndex]]:
+    """create_list and create_index of every level of data; build once and pass to extract_address_components"""
+    tables = {}
+    for level in ("provinces", "districts", "wards"):
+        reference_list = create_list(set(data[level]))
+        tables[level] = (reference_list, create_index(reference_list))
+    return tables
+
+def extract_address_components(
+    text: str,
+    data : dict[str, list[Any]],
+    tables: Optional[Dict[str, Tuple[List[Tuple[str, str]], QGramIndex]]] = None
+) -> Dict[str, str]:
     # Helper: Check if string has Vietnamese accents
     def has_accents(s: str) -> bool:
         return any('WITH' in unicodedata.name(c, '') for c in s if c.isalpha())
@@ -43,35 +65,11 @@ def extract_address_components(text: str, data : dict[str, list[Any]]) -> Dict[s
         print(f"Break_ties: Selected '{candidates[0]}' for original '{original}', fuzz ratio: {fuzz.ratio(candidates[0].lower(), original)}")
         return candidates[0]
 
-    # Levenshtein distance
-    def levenshtein(s1: str, s2: str) -> int:
-        if len(s1) < len(s2):
-            return levenshtein(s2, s1)
-        if len(s2) == 0:
-            return len(s1)
-        previous_row = range(len(s2) + 1)
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-        return previous_row[-1]
-
-    # Load data
-    provinces = set(data["provinces"])
-    districts = set(data["districts"])
-    wards = set(data["wards"])
-
-    # Create lists of (condensed, original)
-    def create_list(names: Set[str]) -> List[Tuple[str, str]]:
-        return [(name.lower().replace(' ', ''), name) for name in names]
-
-    province_list = create_list(provinces)
-    district_list = create_list(districts)
-    ward_list = create_list(wards)
+    # Lists of (condensed, original) + q-gram index of each level, built once per data
+    tables = tables or create_tables(data)
+    province_list, province_index = tables["provinces"]
+    district_list, district_index = tables["districts"]
+    ward_list, ward_index = tables["wards"]
 
     # Define prefixes
     province_prefixes = ['', 'thành phố', 'thanh pho', 'thanhpho', 'tp', 'tp.', 't.p', 't', 'thnàh phố', 'thànhphố', 'tỉnh', 'tinh', 't.', 'tí', 'tinhf', 'tin', 'tnh', 't.phố', 't phố', 't.pho', 't pho']
@@ -79,7 +77,7 @@ def extract_address_components(text: str, data : dict[str, list[Any]]) -> Dict[s
     ward_prefixes = ['', 'phường', 'phuong', 'p', 'p.', 'ph', 'ph.', 'phuờng', 'phưng', 'puong', 'xã', 'xa', 'x', 'x.', 'xá', 'xạ', 'xãa', 'thị trấn', 'thi tran', 'thitran', 'tt', 'tt.', 't.t', 'th', 'ttr', 'thịtrấn', 't.trấn', 't tran', 't trấn', 't.tran']
 
     # Find best match for a level
-    def find_match(tokens: List[str], reference_list: List[Tuple[str, str]], prefixes: List[str], level: str) -> Tuple[Optional[str], int]:
+    def find_match(tokens: List[str], reference_list: List[Tuple[str, str]], index: QGramIndex, prefixes: List[str], level: str) -> Tuple[Optional[str], int]:
         print(f"\nMatching for {level} with tokens: {tokens}")
         all_matches: List[Tuple[str, int, int, int]] = []
 
@@ -103,11 +101,7 @@ def extract_address_components(text: str, data : dict[str, list[Any]]) -> Dict[s
 
                     ref_len = len(cond_cand)
                     thresh = max(1, ref_len // 2)
-                    matches = []
-                    for cond_ref, orig in reference_list:
-                        dist = levenshtein(cond_cand, cond_ref)
-                        if dist <= thresh:
-                            matches.append((orig, dist))
+                    matches = reference_matches(cond_cand, reference_list, index, thresh)
                     if matches:
                         min_dist = min(m[1] for m in matches)
                         best_candidates = [m[0] for m in matches if m[1] == min_dist]
@@ -140,11 +134,7 @@ def extract_address_components(text: str, data : dict[str, list[Any]]) -> Dict[s
                 continue
             ref_len = len(cond_cand)
             thresh = max(1, ref_len // 2)
-            matches = []
-            for cond_ref, orig in reference_list:
-                dist = levenshtein(cond_cand, cond_ref)
-                if dist <= thresh:
-                    matches.append((orig, dist))
+            matches = reference_matches(cond_cand, reference_list, index, thresh)
             if matches:
                 min_dist = min(m[1] for m in matches)
                 best_candidates = [m[0] for m in matches if m[1] == min_dist]
@@ -241,13 +231,13 @@ def extract_address_components(text: str, data : dict[str, list[Any]]) -> Dict[s
 
     result = {"province": "", "district": "", "ward": ""}
     levels = [
-        ("province", province_list, province_prefixes),
-        ("district", district_list, district_prefixes),
-        ("ward", ward_list, ward_prefixes)
+        ("province", province_list, province_index, province_prefixes),
+        ("district", district_list, district_index, district_prefixes),
+        ("ward", ward_list, ward_index, ward_prefixes)
     ]
 
-    for level_name, reference_list, prefixes in levels:
-        match, num_pop = find_match(tokens, reference_list, prefixes, level_name)
+    for level_name, reference_list, index, prefixes in levels:
+        match, num_pop = find_match(tokens, reference_list, index, prefixes, level_name)
         if match:
             result[level_name] = match
             tokens = tokens[:-num_pop]
@@ -258,8 +248,16 @@ def extract_address_components(text: str, data : dict[str, list[Any]]) -> Dict[s
     print(f"Extracted result: {result}")
     return result
 
-def find_match(tokens: List[str], reference_list: List[Tuple[str, str]], prefixes: List[str], level: str) -> Tuple[Optional[str], int]:
-    import Levenshtein
+def find_match(
+    tokens: List[str],
+    reference_list: List[Tuple[str, str]],
+    prefixes: List[str],
+    level: str,
+    index: Optional[QGramIndex] = None
+) -> Tuple[Optional[str], int]:
+    # index: create_index(reference_list), truyền vào để không build lại ở mỗi lần gọi
+    if index is None:
+        index = create_index(reference_list)
     all_matches: List[Tuple[str, int, int, int]] = []
 
     # Prefix-driven matching
@@ -282,11 +280,7 @@ def find_match(tokens: List[str], reference_list: List[Tuple[str, str]], prefixe
 
                 ref_len = len(cond_cand)
                 thresh = max(1, ref_len // 2)
-                matches = []
-                for cond_ref, orig in reference_list:
-                    dist = Levenshtein.distance(cond_cand, cond_ref)
-                    if dist <= thresh:
-                        matches.append((orig, dist))
+                matches = reference_matches(cond_cand, reference_list, index, thresh)
                 if matches:
                     min_dist = min(m[1] for m in matches)
                     best_candidates = [m[0] for m in matches if m[1] == min_dist]
@@ -319,11 +313,7 @@ def find_match(tokens: List[str], reference_list: List[Tuple[str, str]], prefixe
             continue
         ref_len = len(cond_cand)
         thresh = max(1, ref_len // 2)
-        matches = []
-        for cond_ref, orig in reference_list:
-            dist = Levenshtein.distance(cond_cand, cond_ref)
-            if dist <= thresh:
-                matches.append((orig, dist))
+        matches = reference_matches(cond_cand, reference_list, index, thresh)
         if matches:
             min_dist = min(m[1] for m in matches)
             best_candidates = [m[0] for m in matches if m[1] == min_dist]
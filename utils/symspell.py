@@ -0,0 +1,97 @@
+"""
+Symmetric delete (SymSpell) index over the words of a BK-tree.
+
+Every word is stored under each string obtained by deleting up to max_delete
+of its characters. Two words within Levenshtein distance k share such a
+string with at most k deletions on each side, so a lookup within max_delete
+is a set of hash probes (the deletes of the query) plus a Levenshtein check of
+the candidates, instead of a tree walk. Larger distances fall back to the BK-tree.
+"""
+
+import Levenshtein
+
+from utils.bktree import BKTree
+
+
+def deletes(word: str, depth: int) -> set[str]:
+    """word and every string obtained by deleting up to depth of its characters"""
+    result = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {text[:i] + text[i + 1 :] for text in frontier for i in range(len(text))}
+        result |= frontier
+    return result
+
+
+class DeleteIndex(BKTree):
+    """
+    BK-tree answering search / search_topk within max_delete from the delete index,
+    with the same results (and order) as the tree. Node ids are the tree ids,
+    so ties keep the tree order.
+    """
+    def __init__(self, tree: BKTree, max_delete: int = 2):
+        super().__init__(tree.tree_type)
+        tree.compact()
+        self.size = tree.size
+        self.words, self.cores = list(tree.words), list(tree.cores)
+        self.edge_start, self.edge_distance, self.edge_child = tree.edge_start[:], tree.edge_distance[:], tree.edge_child[:]
+        self._children = None
+        self.max_delete = max_delete
+        self.deletes: dict[str, list[int]] = {}
+        self._index()
+
+    def _index(self):
+        index: dict[str, list[int]] = {}
+        for node, word in enumerate(self.words):
+            for key in deletes(word, self.max_delete):
+                index.setdefault(key, []).append(node)
+        self.deletes = index
+
+    def compact(self):
+        # insert sau khi build: compact đánh lại id node -> dựng lại index
+        if self._children is not None:
+            super().compact()
+            self._index()
+
+    def _hits(self, word: str, max_distance: int) -> list[tuple[int, int]]:
+        """(distance, node) of every word within max_distance (<= max_delete) of word"""
+        words, index = self.words, self.deletes
+        seen: set[int] = set()
+        hits = []
+        for key in deletes(word, max_distance):
+            for node in index.get(key, ()):
+                if node in seen:
+                    continue
+                seen.add(node)
+                distance = Levenshtein.distance(words[node], word, score_cutoff=max_distance)
+                if distance <= max_distance:
+                    hits.append((distance, node))
+        return hits
+
+    def search(self, word: str, preprocess=None, max_distance: int = 2):
+        if max_distance > self.max_delete:
+            return super().search(word, preprocess, max_distance)
+        if not self.words or max_distance < 0:
+            return []
+        self.compact()
+
+        word = preprocess(word) if preprocess else word.lower()
+        hits = sorted(self._hits(word, max_distance), key=lambda hit: hit[1])
+        return sorted(((self.words[node], self.cores[node], distance) for distance, node in hits), key=lambda x: x[1])
+
+    def search_topk(self, word: str, k: int = 1, max_distance: int = 2, preprocess=None, ties: bool = False):
+        if not self.words or k <= 0 or max_distance < 0:
+            return []
+        self.compact()
+
+        query = preprocess(word) if preprocess else word.lower()
+        hits = sorted(self._hits(query, min(max_distance, self.max_delete)))
+        if len(hits) < k and max_distance > self.max_delete:
+            # chưa đủ k từ trong max_delete: phần còn lại chỉ tìm được bằng cây
+            return super().search_topk(word, k, max_distance, preprocess, ties)
+
+        if ties and len(hits) >= k:
+            hits = [hit for hit in hits if hit[0] <= hits[k - 1][0]]
+        elif not ties:
+            hits = hits[:k]
+        return [(self.words[node], self.cores[node], distance) for distance, node in hits]
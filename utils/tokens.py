@@ -0,0 +1,142 @@
+"""
+Token stream with character offsets.
+
+An address is split into whitespace separated tokens once; stages address
+phrases as token ranges and read positions from the token offsets instead of
+re-splitting the string and searching it again with str.index (which finds
+the first occurrence only, possibly inside another word).
+
+NormalizedText holds the normalized / diacritics / nospace views of one input,
+each computed once, with offset maps from every view back to the raw input.
+"""
+
+import re
+from bisect import bisect_right
+from functools import cached_property
+from typing import Callable, Literal, NamedTuple
+
+from utils.preprocess import to_diacritics, to_normalized, to_nospace
+
+WORD = re.compile(r"\S+")
+
+
+class Token(NamedTuple):
+    text: str
+    start: int      # offset trong TokenStream.text
+    end: int
+    raw_start: int  # offset của từ gốc trong TokenStream.raw
+    raw_end: int
+
+
+class TokenStream:
+    """
+    Tokens of raw. With normalize, each raw word is normalized on its own and
+    may give several tokens (or none), which all keep the offsets of that raw word.
+    text is the single-spaced join of the tokens (= normalize(raw) for the
+    to_normalized* functions, which never merge words).
+    """
+    def __init__(self, raw: str, normalize: Callable[[str], str] | None = None):
+        tokens: list[Token] = []
+        position = 0
+        for match in WORD.finditer(raw):
+            words = normalize(match.group()).split() if normalize else [match.group()]
+            for word in words:
+                tokens.append(Token(word, position, position + len(word), match.start(), match.end()))
+                position += len(word) + 1
+
+        self.raw = raw
+        self.tokens = tokens
+        self.text = " ".join(token.text for token in tokens)
+        self.starts = [token.start for token in tokens]
+        self.raw_ends = [token.raw_end for token in tokens]
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __getitem__(self, index: int | slice) -> Token | list[Token]:
+        return self.tokens[index]
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def phrase(self, first: int, last: int) -> str:
+        """Tokens [first, last) joined by single spaces"""
+        return self.text[self.tokens[first].start : self.tokens[last - 1].end]
+
+    def span(self, first: int, last: int) -> tuple[int, int]:
+        """(start, end) of tokens [first, last) in text"""
+        return self.tokens[first].start, self.tokens[last - 1].end
+
+    def raw_span(self, first: int, last: int) -> tuple[int, int]:
+        """(start, end) of tokens [first, last) in raw"""
+        return self.tokens[first].raw_start, self.tokens[last - 1].raw_end
+
+    def count_until(self, raw_offset: int) -> int:
+        """Number of tokens ending at or before raw_offset"""
+        return bisect_right(self.raw_ends, raw_offset)
+
+    def token_at(self, offset: int) -> int:
+        """Index of the token containing text[offset] (or the space after it)"""
+        return bisect_right(self.starts, offset) - 1
+
+
+class NormalizedText:
+    """
+    Views of raw used by the trie stages, computed on first access:
+    normalized = normalize(raw), diacritics = to_diacritics(normalized),
+    nospace = to_nospace(diacritics).
+    """
+    def __init__(self, raw: str, normalize: Callable[[str], str] = to_normalized):
+        self.raw = raw
+        self.normalize = normalize
+
+    def __repr__(self) -> str:
+        return f"NormalizedText({self.raw!r})"
+
+    @cached_property
+    def normalized(self) -> str:
+        return self.normalize(self.raw)
+
+    @cached_property
+    def diacritics(self) -> str:
+        return to_diacritics(self.normalized)
+
+    @cached_property
+    def nospace(self) -> str:
+        return to_nospace(self.diacritics)
+
+    def view(self, processor: Literal["normalized", "diacritics", "nospace"]) -> str:
+        return getattr(self, processor)
+
+    @cached_property
+    def tokens(self) -> TokenStream:
+        """Tokens of the normalized view with the offsets of their raw words"""
+        return TokenStream(self.raw, self.normalize)
+
+    @cached_property
+    def diacritics_offsets(self) -> list[int]:
+        """Index in normalized of every char of diacritics"""
+        if len(self.diacritics) == len(self.normalized):
+            return list(range(len(self.normalized)))
+        # ký tự bị bỏ / tách khi bỏ dấu: đếm lại theo từng ký tự
+        return [i for i, ch in enumerate(self.normalized) for _ in to_diacritics(ch)]
+
+    @cached_property
+    def nospace_offsets(self) -> list[int]:
+        """Index in diacritics of every char of nospace"""
+        return [i for i, ch in enumerate(self.diacritics) if ch != " "]
+
+    def normalized_offset(self, processor: Literal["normalized", "diacritics", "nospace"], index: int) -> int:
+        """Index in normalized of the char at index in the given view"""
+        if processor == "nospace":
+            index = self.nospace_offsets[index]
+        if processor != "normalized":
+            index = self.diacritics_offsets[index]
+        return index
+
+    def raw_span(self, processor: Literal["normalized", "diacritics", "nospace"], start: int, end: int) -> tuple[int, int]:
+        """Span in raw of the raw words covering view[start:end] (end exclusive, end > start)"""
+        tokens = self.tokens
+        first = tokens.token_at(self.normalized_offset(processor, start))
+        last = tokens.token_at(self.normalized_offset(processor, end - 1))
+        return tokens[first].raw_start, tokens[last].raw_end
@@ -1,97 +1,328 @@
-from typing import Literal
-from utils.preprocess import to_diacritics, to_normalized, to_nospace
+import threading
+from collections import OrderedDict
+from typing import Literal, NamedTuple
+from utils.preprocess import remove_diacritics, to_diacritics, to_normalized, to_nospace
+from utils.tokens import NormalizedText
 from utils.input import preprocess_input
 
-def build_automaton(
-    dictionary: list[str], 
-    address_type: Literal["provinces", " districts", "wards"],
+VIEWS = ("normalized", "diacritics", "nospace")
+# số lần quét gần nhất được giữ lại trên mỗi automaton (xem AddressAutomaton.cached_scan)
+SCAN_CACHE_SIZE = 16
+
+def build_view_entries(
+    data: dict[str, list[str]],
     prefix_dict : dict[str, dict[str, dict[str, list[str]]]],
-):
-    import ahocorasick
+    views: tuple[str, ...] = VIEWS,
+) -> dict[str, dict[str, dict[str, tuple[str, list[str]]]]]:
+    """Keys of every view over every level of data: {view: {key: {level: (prefix, words)}}}"""
     def get_abbreviation(address: str):
         input = address.lower().split()
         return "".join([word[0] for word in input])
-    
-    A_normalized = ahocorasick.Automaton()
-    A_diacritics = ahocorasick.Automaton()
-    A_nospace = ahocorasick.Automaton()
-
-    for word in dictionary:
-        if not word:
-            continue
-        variants: dict[str, str] = {"": word}
-
-        for prefix in prefix_dict["full"]["normalized"][address_type]:
-            variants[prefix + " "] = prefix + " " + word
-            # variants[get_abbreviation(prefix) + " "] = (get_abbreviation(prefix) + " " + word)
-    
-            variants[prefix] = prefix + word
-            variants[get_abbreviation(prefix)] = get_abbreviation(prefix) + word
 
-        if word.isdigit() or word in ["I", "III", "IV", "V", "VII"]:
-            variants.pop("")            
+    entries: dict[str, dict[str, dict[str, tuple[str, list[str]]]]] = {view: {} for view in views}
+
+    def add(view: str, key: str, level: str, prefix: str, word: str, merge: bool):
+        records = entries[view].setdefault(key, {})
+        # merge: gom nhiều word vào list, ngược lại word sau ghi đè word trước
+        if merge and level in records:
+            _, words = records[level]
+            if word not in words:
+                words.append(word)
+        else:
+            records[level] = (prefix, [word])
 
-        for k, v in variants.items():
+    # prefix giống nhau cho mọi word -> chỉ chuẩn hóa một lần
+    prefix_forms: dict[str, tuple[str, str, str]] = {}
 
-            var_normalized = to_normalized(v)
-            var_diacritics = to_diacritics(var_normalized)
-            var_nospace = to_nospace(var_diacritics)
+    for address_type, dictionary in data.items():
+        for word in dictionary:
+            if not word:
+                continue
+            variants: dict[str, str] = {"": word}
+
+            for prefix in prefix_dict["full"]["normalized"][address_type]:
+                variants[prefix + " "] = prefix + " " + word
+                # variants[get_abbreviation(prefix) + " "] = (get_abbreviation(prefix) + " " + word)
+
+                variants[prefix] = prefix + word
+                variants[get_abbreviation(prefix)] = get_abbreviation(prefix) + word
+
+            if word.isdigit() or word in ["I", "III", "IV", "V", "VII"]:
+                variants.pop("")
+
+            is_roman = word in ["I", "III", "IV", "V", "VII"]
+            word_normalized = to_normalized(word)
+            has_diacritics = word_normalized != to_diacritics(word_normalized)
+
+            for k, v in variants.items():
+
+                var_normalized = to_normalized(v)
+                var_diacritics = to_diacritics(var_normalized)
+                var_nospace = to_nospace(var_diacritics)
+
+                if k not in prefix_forms:
+                    pref_normalized = to_normalized(k)
+                    pref_diacritics = to_diacritics(pref_normalized)
+                    prefix_forms[k] = (pref_normalized, pref_diacritics, to_nospace(pref_diacritics))
+                pref_normalized, pref_diacritics, pref_nospace = prefix_forms[k]
+
+                if  "normalized" in entries and \
+                    not is_roman and \
+                    (k != "" or has_diacritics):
+                    add("normalized", var_normalized, address_type, pref_normalized, word, merge=False)
+
+                if "diacritics" in entries:
+                    add("diacritics", var_diacritics, address_type, pref_diacritics, word, merge=True)
+
+                if "nospace" in entries:
+                    add("nospace", var_nospace, address_type, pref_nospace, word, merge=True)
+
+    return entries
+
+
+def name_features(name: str) -> tuple[str, str, str, int]:
+    """Normalized / diacritics / nospace forms of a name and the diacritics count of its normalized form"""
+    normalized = to_normalized(name)
+    diacritics = to_diacritics(normalized)
+    return normalized, diacritics, to_nospace(diacritics), count_diacritics(normalized)
+
+
+def prefix_score(prefix: str) -> int:
+    return len(prefix) + count_diacritics(prefix)
+
+
+class ScoreFeatures:
+    """Scoring features of every name and prefix of an index, computed once when the index is built"""
+    def __init__(self, names: list[str], prefixes: list[str]):
+        self.names = {name: name_features(name) for name in names}
+        self.prefixes = {prefix: prefix_score(prefix) for prefix in prefixes}
+        self.max_prefix_score = max(self.prefixes.values(), default=0)
+
+    def name(self, name: str) -> tuple[str, str, str, int]:
+        features = self.names.get(name)
+        return features if features is not None else name_features(name)
+
+    def prefix(self, prefix: str) -> int:
+        score = self.prefixes.get(prefix)
+        return score if score is not None else prefix_score(prefix)
+
+
+class AddressAutomaton:
+    """
+    One Aho-Corasick automaton over every view and level.
+
+    The value of a key is entry_id << 3 | bitmask of the views it belongs to.
+    The records of an entry (view, level, prefix, names) live in flat arrays and
+    the canonical names in one shared table, instead of a Python tuple per key and view.
+    automaton[view] is the handle the pipelines scan with (see match_table).
+    """
+    def __init__(self, view_entries: dict[str, dict[str, dict[str, tuple[str, list[str]]]]], levels: tuple[str, ...]):
+        import ahocorasick
+        from array import array
+
+        self.views = tuple(view for view in VIEWS if view in view_entries)
+        self.levels = tuple(levels)
+        self.names: list[str] = []
+        self.prefixes: list[str] = []
+        self.lengths = array("B")
+        self.max_length = 0
+        self.entry_start = array("I", [0])
+        self.record_view = array("B")
+        self.record_level = array("B")
+        self.record_prefix = array("H")
+        self.names_start = array("I", [0])
+        self.record_names = array("I")
+        self.automaton = ahocorasick.Automaton(ahocorasick.STORE_INTS)
+
+        name_ids: dict[str, int] = {}
+        prefix_ids: dict[str, int] = {}
+        keys = dict.fromkeys(key for view in self.views for key in view_entries[view])
+        for entry, key in enumerate(keys):
+            mask = 0
+            for view in self.views:
+                records = view_entries[view].get(key)
+                if records is None:
+                    continue
+                mask |= 1 << VIEWS.index(view)
+                for level, (prefix, words) in records.items():
+                    self.record_view.append(VIEWS.index(view))
+                    self.record_level.append(self.levels.index(level))
+                    self.record_prefix.append(prefix_ids.setdefault(prefix, len(prefix_ids)))
+                    self.record_names.extend(name_ids.setdefault(word, len(name_ids)) for word in words)
+                    self.names_start.append(len(self.record_names))
+            self.lengths.append(len(key))
+            self.max_length = max(self.max_length, len(key))
+            self.entry_start.append(len(self.record_view))
+            self.automaton.add_word(key, entry << 3 | mask)
+
+        self.names = list(name_ids)
+        self.prefixes = list(prefix_ids)
+        self.features = ScoreFeatures(self.names, self.prefixes)
+        self.automaton.make_automaton()
+        self._init_scan_cache()
+
+    def _init_scan_cache(self):
+        # cache thuộc về automaton: được giải phóng cùng index, không nằm trong snapshot
+        self._scans: OrderedDict = OrderedDict()
+        self._scans_lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_scans", None)
+        state.pop("_scans_lock", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_scan_cache()
+
+    def __getitem__(self, view: str) -> "AutomatonView":
+        if view not in self.views:
+            raise KeyError(view)
+        return AutomatonView(self, view)
+
+    def __contains__(self, view) -> bool:
+        return view in self.views
+
+    def __iter__(self):
+        return iter(self.views)
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    def scan(
+        self,
+        input: str,
+        views: tuple[str, ...] | None = None,
+        start: int = 0,
+        end: int | None = None,
+    ) -> dict[str, dict[str, list[tuple[int, str, tuple[str, ...], int]]]]:
+        """
+        Single pass over input[start:end], keeps only keys lying entirely inside the window
+        (end positions stay relative to input): {view: {level: [(end, prefix, words, length)]}}
+        """
+        views = views or self.views
+        wanted = sum(1 << VIEWS.index(view) for view in views)
+        tables: dict[str, dict[str, list[tuple[int, str, tuple[str, ...], int]]]] = {view: {} for view in views}
+
+        for end, value in self.automaton.iter(input, start, len(input) if end is None else end):
+            if not value & wanted:
+                continue
+            entry = value >> 3
+            length = self.lengths[entry]
+            for record in range(self.entry_start[entry], self.entry_start[entry + 1]):
+                view = self.record_view[record]
+                if not (1 << view) & wanted:
+                    continue
+                words = tuple(self.names[i] for i in self.record_names[self.names_start[record] : self.names_start[record + 1]])
+                tables[VIEWS[view]].setdefault(self.levels[self.record_level[record]], []).append(
+                    (end, self.prefixes[self.record_prefix[record]], words, length)
+                )
+        return tables
+
+    def cached_scan(
+        self,
+        input: str,
+        start: int = 0,
+        end: int | None = None,
+    ) -> dict[str, dict[str, list[tuple[int, str, tuple[str, ...], int]]]]:
+        """scan over every view, the last SCAN_CACHE_SIZE results kept (LRU). Do not mutate the result."""
+        key = (input, start, end)
+        with self._scans_lock:
+            tables = self._scans.get(key)
+            if tables is not None:
+                self._scans.move_to_end(key)
+                return tables
+        tables = self.scan(input, start=start, end=end)
+        with self._scans_lock:
+            self._scans[key] = tables
+            if len(self._scans) > SCAN_CACHE_SIZE:
+                self._scans.popitem(last=False)
+        return tables
+
+
+class AutomatonView(NamedTuple):
+    automaton: AddressAutomaton
+    view: str
+
+    @property
+    def max_length(self) -> int:
+        return self.automaton.max_length
+
+    @property
+    def features(self) -> ScoreFeatures:
+        return self.automaton.features
 
-            pref_normalized = to_normalized(k)
-            pref_diacritics = to_diacritics(pref_normalized)
-            pref_nospace = to_nospace(pref_diacritics)               
 
-            if  word not in ["I", "III", "IV", "V", "VII"] and \
-                (
-                    k != "" or (
-                        k == "" and to_normalized(word) != to_diacritics(to_normalized(word))
-                    )
-                ):
-                A_normalized.add_word(var_normalized, (pref_normalized, [word], len(var_normalized)))
-            
-            if var_diacritics in A_diacritics:
-                pref, words, l = A_diacritics.get(var_diacritics)
-                if word not in words:
-                    words.append(word)
-                A_diacritics.add_word(var_diacritics, (pref, words, l))
-            else:
-                A_diacritics.add_word(var_diacritics, (pref_diacritics, [word], len(var_diacritics)))
-
-            # nospace: gom nhiều word vào list
-            if var_nospace in A_nospace:
-                pref, words, l = A_nospace.get(var_nospace)
-                if word not in words:
-                    words.append(word)
-                A_nospace.add_word(var_nospace, (pref, words, l))
-            else:
-                A_nospace.add_word(var_nospace, (pref_nospace, [word], len(var_nospace)))
-
-    A_normalized.make_automaton()
-    A_diacritics.make_automaton()
-    A_nospace.make_automaton()
-    return A_normalized, A_diacritics, A_nospace
-
-
-def build_all_automaton(data: dict, prefix_dict):  # -> dict[str, dict[Any, Any]]:
-    automaton = {
-        "normalized": {},
-        "diacritics": {},
-        "nospace": {},
-    }
-    for k, v in data.items():
-        (
-            automaton["normalized"][k],
-            automaton["diacritics"][k],
-            automaton["nospace"][k],
-        ) = build_automaton(v, k,prefix_dict)
-    return automaton
-
-
-def check_automaton(automaton, input: str):
-    result: list[tuple[str, str, str]] = []
-    best_candidates: dict[str, list[tuple[str, str, str]]] = {}
-
-    for end, (prefix, words, length) in automaton.iter(input):
+def build_automaton(
+    data: dict[str, list[str]],
+    prefix_dict : dict[str, dict[str, dict[str, list[str]]]],
+    views: tuple[str, ...] = VIEWS,
+) -> AddressAutomaton:
+    """One automaton covering every view and every level of data (provinces / districts / wards)"""
+    return AddressAutomaton(build_view_entries(data, prefix_dict, views), tuple(data))
+
+
+def build_all_automaton(data: dict, prefix_dict, levels=None, views: tuple[str, ...] = VIEWS) -> AddressAutomaton:
+    data = {k: v for k, v in data.items() if levels is None or k in levels}
+    return build_automaton(data, prefix_dict, views)
+
+
+def match_tables(
+    automaton: AddressAutomaton,
+    input: str,
+    start: int = 0,
+    end: int | None = None,
+) -> dict[str, dict[str, list[tuple[int, str, tuple[str, ...], int]]]]:
+    """
+    Cached AddressAutomaton.scan: every view / level / stage reading the same text (and window)
+    shares one scan (normalized and diacritics text are the same for input without accents).
+    The cache lives on the automaton, so it is freed with it. Do not mutate the result.
+    """
+    return automaton.cached_scan(input, start, end)
+
+
+def match_table(
+    automaton: AutomatonView,
+    input: str,
+    start: int = 0,
+    end: int | None = None,
+) -> dict[str, list[tuple[int, str, tuple[str, ...], int]]]:
+    """Matches of one view in input[start:end] grouped by level: {level: [(end, prefix, words, length)]}"""
+    return match_tables(automaton.automaton, input, start, end)[automaton.view]
+
+
+def remaining_length(input: str, start: int, end: int) -> int | None:
+    """
+    len(to_normalized(remove_detected(input, (start, end))[0])) for an input that is already
+    normalized, without building the string. None when the cut joins two digits, to_normalized
+    may then drop the merged number.
+    """
+    before = input[start - 1] if start > 0 else ""
+    after = input[end + 1] if end + 1 < len(input) else ""
+    if before.isdigit() and after.isdigit():
+        return None
+
+    length = len(input) - (end - start + 1)
+    # khoảng trắng thừa ở chỗ cắt (hai khoảng trắng liền nhau, hoặc ở đầu / cuối) bị gom lại
+    if after == " " and before in ("", " "):
+        length -= 1
+    elif before == " " and after == "":
+        length -= 1
+    return length
+
+
+def cut_normalized(input: str, start: int, end: int) -> tuple[str, str]:
+    """to_normalized of both parts of remove_detected, valid when remaining_length is not None"""
+    return " ".join((input[:start] + input[end + 1 :]).split()), input[start : end + 1].strip()
+
+
+def check_automaton(automaton, input: str, address_type: Literal["provinces", "districts", "wards"]):
+    # candidate là span (start, end, prefix) trên input, chỉ dựng remaining / origin cho candidate thắng
+    best_candidates: dict[str, tuple[int, list[tuple[int, int, str, bool]]]] = {}
+    is_normalized = to_normalized(input) == input
+
+    for end, prefix, words, length in match_table(automaton, input).get(address_type, ()):
         start = end - length + 1
 
         for word in words:
@@ -99,34 +330,45 @@ def check_automaton(automaton, input: str):
                 if (end + 1) < len(input) and input[end + 1].isdigit():
                     continue  # skip candidate vì bị cắt số
 
-            remaining, origin = remove_detected(input, (start, end))
-            remaining, origin = to_normalized(remaining), to_normalized(origin)
-            candidate = (remaining, prefix, origin)
+            new_len = remaining_length(input, start, end) if is_normalized else None
+            exact = new_len is not None
+            if not exact:
+                new_len = len(to_normalized(remove_detected(input, (start, end))[0]))
+            candidate = (start, end, prefix, exact)
 
             if word not in best_candidates:
-                best_candidates[word] = [candidate]
+                best_candidates[word] = (new_len + len(prefix), [candidate])
             else:
-                current_best_len = len(best_candidates[word][0][0]) + len(best_candidates[word][0][1])
-                new_len = len(remaining)
+                current_best_len, candidates = best_candidates[word]
                 if new_len < current_best_len:
-                    best_candidates[word] = [candidate]
+                    best_candidates[word] = (new_len + len(prefix), [candidate])
                 elif new_len == current_best_len:
-                    if candidate not in best_candidates[word]:
-                        best_candidates[word].append(candidate)
-
-            result.append((word, remaining, prefix))
+                    candidates.append(candidate)
 
     # flatten thành list
-    return [(k, rem, pre, org) for k, vals in best_candidates.items() for rem, pre, org in vals]
+    result: list[tuple[str, str, str, str]] = []
+    for word, (_, candidates) in best_candidates.items():
+        materialized: list[tuple[str, str, str]] = []
+        for start, end, prefix, exact in candidates:
+            if exact:
+                remaining, origin = cut_normalized(input, start, end)
+            else:
+                remaining, origin = remove_detected(input, (start, end))
+                remaining, origin = to_normalized(remaining), to_normalized(origin)
+            candidate = (remaining, prefix, origin)
+            if candidate not in materialized:
+                materialized.append(candidate)
+        result.extend((word, rem, pre, org) for rem, pre, org in materialized)
+    return result
 
 def remove_detected(input: str, detected: tuple[int, int]):
     return input[: detected[0]] + input[detected[1] + 1 :], input[detected[0] : detected[1]+1]
 
 
-def detect_with_last(automaton, input_remaining, last_value, last_prefix, last_org):
+def detect_with_last(automaton, address_type, input_remaining, last_value, last_prefix, last_org):
     if last_value: 
         return [(last_value, input_remaining, last_prefix, last_org)]
-    return check_automaton(automaton, input_remaining) + [(last_value, input_remaining, last_prefix, last_org)]
+    return check_automaton(automaton, input_remaining, address_type) + [(last_value, input_remaining, last_prefix, last_org)]
 
 def classify_case(addr):
     labels = ["province", "district", "ward"]
@@ -135,117 +377,231 @@ def classify_case(addr):
 
 
 def count_diacritics(text: str) -> int:
-    import unicodedata
+    # remove_diacritics bỏ đúng các ký tự có "combining mark" khi phân rã => số ký tự có dấu
+    return len(text) - len(remove_diacritics(text))
 
-    count = 0
-    for ch in text:
-        decomp = unicodedata.normalize("NFD", ch)
-        # Nếu ký tự sau khi phân rã có chứa "combining mark" => là ký tự có dấu
-        if any(unicodedata.category(c) == "Mn" for c in decomp):
-            count += 1
-    return count
 
+SCORE_WEIGHT = {
+    "address": 50,
+    "diacritics": 30,
+    "address_detected": 30,
+    "prefix": 50,
+    "remaining": 25,
+}
+PROCESSOR_SCORE = {"normalized": 3, "diacritics": 2, "nospace": 1, None: 0}
+LEVELS = ("provinces", "districts", "wards")
+LEVEL_SCORE = (3, 2, 1)
 
-def score(
+
+def score_parts(
     address: tuple[str | None, str | None, str | None] = (None, None, None),
     prefix: tuple[str | None, str | None, str | None] = (None, None, None),
-    remaining=None,
-    processor=None,
-    origin: tuple[str | None, str | None, str | None] = (None, None, None)
-):
-    weight = {
-        "address": 50,
-        "diacritics": 30,
-        "address_detected": 30,
-        "prefix": 50,
-        "remaining": 25,
-    }
-    processor_dict = {"normalized": 3, "diacritics": 2, "nospace": 1, None: 0}
-    province, district, ward = address
-    province_org, district_org, ward_org = origin
-    province_prefix, district_prefix, ward_prefix = prefix
-
-    # component scoring order: (name, score base, current, last)
-    components = [
-        ("provinces", 3, province, province_prefix, province_org),
-        ("districts", 2, district, district_prefix, district_org),
-        ("wards", 1, ward, ward_prefix, ward_org),
-    ]
+    origin: tuple[str | None, str | None, str | None] = (None, None, None),
+    features: ScoreFeatures | None = None,
+) -> tuple[int, int]:
+    """
+    Per-level part of score() (sum over the detected levels) and size_total = 1 + detected length.
+    features: precomputed name / prefix features of the index, computed on the fly when None.
+    """
+    weight = SCORE_WEIGHT
+    processor_dict = PROCESSOR_SCORE
+
     address_sc, addr_detected_sc, diacritic_sc, prefix_sc, size_total = 0, 0, 0, 0, 1
-    for _, base_score, current, pref, org in components:
+    for base_score, current, pref, org in zip(LEVEL_SCORE, address, prefix, origin):
         if current:
             address_sc += base_score
             # if processor == "normalized":
             #     diacritic_sc += count_diacritics(current)
             if org:
                 size_total += len(org)
-                normalized_input = to_normalized(current)
-                diacritics_input = to_diacritics(normalized_input)
-                nospace_input = to_nospace(diacritics_input)
+                normalized_input, diacritics_input, nospace_input, diacritics_count = (
+                    features.name(current) if features else name_features(current)
+                )
                 if normalized_input in org and normalized_input != diacritics_input:
                     addr_detected_sc += processor_dict["normalized"]
-                    diacritic_sc += count_diacritics(normalized_input) * processor_dict["normalized"]
+                    diacritic_sc += diacritics_count * processor_dict["normalized"]
                 elif diacritics_input in org:
                     addr_detected_sc += processor_dict["diacritics"]
                 elif nospace_input in org:
                     addr_detected_sc += processor_dict["nospace"]
                         
             if pref:
-                prefix_sc += len(pref)
-                prefix_sc += count_diacritics(pref)
-                
-
-    remaining_sc = float(size_total / len(remaining)) if remaining else 10000
-    # processor_sc = processor_dict[processor] if processor else 0
+                prefix_sc += features.prefix(pref) if features else prefix_score(pref)
 
-    return int(
+    return (
         address_sc * weight["address"]
         + diacritic_sc * weight["diacritics"]
-        # + processor_sc * weight["processor"]
         + addr_detected_sc * weight["address_detected"]
         + prefix_sc * weight["prefix"]
-        + int(remaining_sc * weight["remaining"])
-    )
+    ), size_total
+
+
+def score(
+    address: tuple[str | None, str | None, str | None] = (None, None, None),
+    prefix: tuple[str | None, str | None, str | None] = (None, None, None),
+    remaining=None,
+    processor=None,
+    origin: tuple[str | None, str | None, str | None] = (None, None, None),
+    features: ScoreFeatures | None = None,
+):
+    parts_sc, size_total = score_parts(address, prefix, origin, features)
+    remaining_sc = float(size_total / len(remaining)) if remaining else 10000
+    # processor_sc = processor_dict[processor] if processor else 0
+
+    return int(parts_sc + int(remaining_sc * SCORE_WEIGHT["remaining"]))
+
+
+def beam_classify_with_trie(
+    processed_input: str,
+    automaton: AutomatonView,
+    processor: Literal["normalized", "diacritics", "nospace"],
+    last_output: tuple[str | None, str | None, str | None],
+    last_origin: tuple[str | None, str | None, str | None],
+    last_prefix: tuple[str, str, str],
+    beam_width: int,
+):
+    """
+    Beam search over province -> district -> ward detections.
+
+    Every level keeps the beam_width partial detections with the highest score upper bound
+    and drops those whose bound is below the beam_width-th best complete candidate seen so far
+    (a partial detection completed with "nothing more detected" is a complete candidate).
+    Returns at most beam_width candidates, best first.
+    """
+    weight = SCORE_WEIGHT
+    features = automaton.features
+    max_prefix_sc = features.max_prefix_score
+    # input chưa chuẩn hóa có thể co lại tùy ý sau to_normalized -> không chặn được phần remaining
+    input_is_normalized = to_normalized(processed_input) == processed_input
+
+    def upper_bound(path, remaining: str) -> int:
+        address, _, prefix, origin = zip(*path) if path else ((), (), (), ())
+        depth = len(path)
+        pad = (None,) * (3 - depth)
+        parts_sc, size_total = score_parts(address + pad, prefix + pad, origin + pad, features)
+
+        shrink, grow = 0, 0
+        cd = count_diacritics(remaining)
+        for level in range(depth, 3):
+            if last_output[level]:
+                # cấp đã biết từ lần trước: đóng góp chính xác
+                fixed = tuple(value if i == level else None for i, value in enumerate(last_output))
+                fixed_prefix = tuple(value if i == level else None for i, value in enumerate(last_prefix))
+                fixed_origin = tuple(value if i == level else None for i, value in enumerate(last_origin))
+                level_sc, level_size = score_parts(fixed, fixed_prefix, fixed_origin, features)
+                parts_sc += level_sc
+                grow += level_size - 1
+            else:
+                parts_sc += (
+                    LEVEL_SCORE[level] * weight["address"]
+                    + PROCESSOR_SCORE["normalized"] * weight["address_detected"]
+                    + cd * PROCESSOR_SCORE["normalized"] * weight["diacritics"]
+                    + max_prefix_sc * weight["prefix"]
+                )
+                # bỏ một key làm remaining ngắn đi tối đa max_length + 4 (khoảng trắng / số bị ghép)
+                shrink += automaton.max_length + 4
+                grow += automaton.max_length
+
+        exact = input_is_normalized or remaining != processed_input
+        final_min = len(remaining) - shrink if exact else 0
+        if final_min >= 1:
+            remaining_sc = (size_total + grow) / final_min
+        else:
+            remaining_sc = max(10000, size_total + grow)
+        return int(parts_sc + int(remaining_sc * weight["remaining"]))
+
+    def is_repeat(address, prefix) -> bool:
+        return all([
+            last_output[0], (address[0] == last_output[0]),
+            last_output[1], (address[1] == last_output[1]),
+            last_output[2], (address[2] == last_output[2]),
+            last_prefix[0], (prefix[0] == last_prefix[0]),
+            last_prefix[1], (prefix[1] == last_prefix[1]),
+            last_prefix[2], (prefix[2] == last_prefix[2]),
+        ])
+
+    complete: dict[tuple, tuple] = {}
+
+    def add_complete(path):
+        # các cấp chưa xét: giữ giá trị cũ / không detect thêm (lựa chọn cuối của detect_with_last)
+        for level in range(len(path), 3):
+            path = path + ((last_output[level], path[-1][1] if path else processed_input, last_prefix[level], last_origin[level]),)
+        if path in complete:
+            return
+        address, remaining, prefix, origin = zip(*path)
+        if is_repeat(address, prefix):
+            return
+        ward_remaining = remaining[-1]
+        complete[path] = (address, ward_remaining, prefix, score(address, prefix, ward_remaining, processor, origin, features), origin)
+
+    hypotheses = [((), processed_input)]
+    for depth, address_type in enumerate(LEVELS):
+        children = []
+        for path, remaining in hypotheses:
+            for option in detect_with_last(automaton, address_type, remaining, last_output[depth], last_prefix[depth], last_origin[depth]):
+                children.append((path + (option,), option[1]))
+        for path, _ in children:
+            add_complete(path)
+
+        scores = sorted((output[3] for output in complete.values()), reverse=True)
+        limit = scores[beam_width - 1] if len(scores) >= beam_width else None
+        ranked = sorted(
+            ((upper_bound(path, remaining), i) for i, (path, remaining) in enumerate(children)),
+            key=lambda x: (-x[0], x[1]),
+        )
+        hypotheses = [children[i] for bound, i in ranked[:beam_width] if limit is None or bound >= limit]
+
+    return sorted(complete.values(), key=lambda x: x[3], reverse=True)[:beam_width]
 
 
 def classify_with_trie(
-    input: str,
+    input: str | NormalizedText,
     automaton: dict,
     processor: Literal["normalized", "diacritics", "nospace"],
     last_output: tuple[str | None, str | None, str | None] = (None, None, None),
     last_origin: tuple[str | None, str | None, str | None] = (None, None, None),
     last_prefix: tuple[str, str, str] = ('', '', ''),
+    beam_width: int | None = None,
 ):
+    """
+    Every province x district x ward detection of input with its score.
+    beam_width switches to beam_classify_with_trie: only the beam_width best candidates,
+    bounded work for inputs with many short matches.
+    """
     candidates = []
     groups = {}
-    normalized_input = to_normalized(input)
-    diacritics_input = to_diacritics(normalized_input)
-    nospace_input = to_nospace(diacritics_input)
-    processed_input = (
-        normalized_input if processor == "normalized" else 
-        diacritics_input if processor == "diacritics" else 
-        nospace_input
-    )
+    # chỉ tính view cần dùng (diacritics / nospace dựng trên normalized)
+    text = input if isinstance(input, NormalizedText) else NormalizedText(input)
+    processed_input = text.view(processor)
+    if beam_width is not None:
+        return beam_classify_with_trie(
+            processed_input, automaton[processor], processor, last_output, last_origin, last_prefix, beam_width
+        )
+
+    features = automaton[processor].features
     last_province, last_district, last_ward = last_output
     last_origin_province, last_origin_district, last_origin_ward = last_origin
     last_prefix_province, last_prefix_district, last_prefix_ward = last_prefix
 
     for detected_province, province_remaining, province_prefix, province_org in detect_with_last(
-        automaton[processor]["provinces"],
+        automaton[processor],
+        "provinces",
         processed_input,
         last_province,
         last_prefix_province,
         last_origin_province
     ):
         for detected_district, district_remaining, district_prefix, district_org in detect_with_last(
-            automaton[processor]["districts"],
+            automaton[processor],
+            "districts",
             province_remaining,
             last_district,
             last_prefix_district,
             last_origin_district
         ):
             for detected_ward, ward_remaining, ward_prefix, ward_org in detect_with_last(
-                automaton[processor]["wards"],
+                automaton[processor],
+                "wards",
                 district_remaining,
                 last_ward,
                 last_prefix_ward,
@@ -269,7 +625,8 @@ def classify_with_trie(
                         (province_prefix, district_prefix, ward_prefix),
                         ward_remaining,
                         processor,
-                        (province_org, district_org, ward_org)
+                        (province_org, district_org, ward_org),
+                        features,
                     ),
                     (province_org, district_org, ward_org),
                 )
@@ -293,10 +650,11 @@ def classify_with_trie(
 def trie_pipeline(
     input: str, 
     automaton: dict, 
+    beam_width: int | None = None,
 ):
     # input_tmp = normalize_input(input)
     input = preprocess_input(input)
-    normalized_outputs = classify_with_trie(input, automaton, processor="normalized")
+    normalized_outputs = classify_with_trie(input, automaton, processor="normalized", beam_width=beam_width)
 
     trie_results = {}
     for (
@@ -322,6 +680,7 @@ def trie_pipeline(
             normalized_address,
             normalized_origin,
             normalized_prefix,
+            beam_width,
         )
         better_diacritics = False
 
@@ -357,6 +716,7 @@ def trie_pipeline(
                 diacritics_address,
                 diacritics_origin,
                 diacritics_prefix,
+                beam_width,
             )
             for (
                 nospace_address,
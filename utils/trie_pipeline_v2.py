@@ -1,9 +1,10 @@
 from typing import Any, Literal
 from utils.fuzz import fuzz_pipeline_v2
 from utils.preprocess import to_normalized_no_comma_deleted as to_normalized
-from utils.preprocess import to_diacritics
 from utils.address_matcher import find_best_match_advanced
 from utils.bktree import bktree_find, prefix_helper
+from utils.tokens import NormalizedText
+from utils.trie import match_table
 from utils.vietnamesse_edit_distance import vietnamese_weighted_edit_distance as vnm_ed
 
 ABBRE_DICT = {
@@ -18,11 +19,17 @@ PREFIX_DICT = {
     "wards" : ["phường", "xã", "thị trấn"]
 }
 
-def check_automaton(automaton, input: str):
+def check_automaton(
+    automaton,
+    input: str,
+    address_type: Literal["provinces", "districts", "wards"],
+    window_start: int = 0,
+    window_end: int | None = None
+):
     res_dict: dict[str, list[tuple[str, str, str]]] = {}
     result = []
 
-    for end, (prefix, words, length) in automaton.iter(input):
+    for end, prefix, words, length in match_table(automaton, input, window_start, window_end).get(address_type, ()):
         for word in words:
             if word.isdigit():
                 if (end + 1) < len(input) and input[end + 1].isdigit():
@@ -46,14 +53,20 @@ def check_automaton(automaton, input: str):
 
 def check_address(
     processed_input: str,
-    automaton: dict[str, Any],
+    automaton: Any,
+    address_type: Literal["provinces", "districts", "wards"],
     last_address = None
 ):
-    address_dict = check_automaton(automaton, processed_input)
     comp = len(processed_input)
     if last_address:
         comp = int(last_address[0]) - len(last_address[3]) - 1
-        
+    if comp <= 0:
+        return [None]
+
+    # chỉ key kết thúc trong [comp - 8, comp] được nhận -> chỉ quét cửa sổ chứa được các key đó
+    window_start = max(0, comp - 8 - automaton.max_length)
+    address_dict = check_automaton(automaton, processed_input, address_type, window_start, min(comp, len(processed_input)))
+
     if address_dict:
         best_key = max((k for k in address_dict.keys() if int(k) <= comp and abs(int(k) - comp) <= 8), default=None)
         if best_key:
@@ -142,16 +155,24 @@ def prefix_helper_check_for_trie(
     
         
 
+def as_normalized_text(text: str | NormalizedText) -> NormalizedText:
+    return text if isinstance(text, NormalizedText) else NormalizedText(text, to_normalized)
+
 def classify_trie_normalized(
-    raw_input: str,
-    automaton: dict[str, dict[str, Any]],
+    raw_input: str | NormalizedText,
+    automaton: dict[str, Any],
     address_type: Literal["provinces", "districts", "wards"],
     last_output: tuple[str, tuple[int | str, str, str, str]] | None = None
 ):
+    # view không được load trong index thì bỏ qua bước này
+    if "normalized" not in automaton:
+        return None
+
     _, last_address = last_output or (None, None)
-    normalized_input = to_normalized(raw_input)
+    text = as_normalized_text(raw_input)
+    raw_input, normalized_input = text.raw, text.normalized
 
-    output = check_address(normalized_input, automaton["normalized"][address_type], last_address)
+    output = check_address(normalized_input, automaton["normalized"], address_type, last_address)
     output = [prefix_helper_check_for_trie(normalized_input, out, address_type) for out in output]
     processed_output = [process_trie_output(raw_input, address_type, out, last_output) for out in output]
     processed_output = fuzz_pipeline_v2(processed_output)
@@ -160,16 +181,48 @@ def classify_trie_normalized(
 
     return None
 
+def is_whole_words(text: str, start: int, end: int) -> bool:
+    """text[start:end] starts and ends on word boundaries"""
+    return (start == 0 or not text[start - 1].isalnum()) and (end >= len(text) or not text[end].isalnum())
+
+def classify_trie_typo(
+    raw_input: str | NormalizedText,
+    typo: Any,
+    address_type: Literal["provinces", "districts", "wards"],
+    last_output: tuple[str, tuple[int | str, str, str, str]] | None = None
+):
+    """classify_trie_normalized over the edit-1 typo automaton (utils.typo), normalized view then diacritic-free view"""
+    if typo is None or address_type not in typo.levels:
+        return None
+
+    _, last_address = last_output or (None, None)
+    text = as_normalized_text(raw_input)
+    for view in typo.views:
+        view_input = text.view(view)
+        output = check_address(view_input, typo[view], address_type, last_address)
+        # key typo phải là cả từ, không khớp giữa một từ khác
+        output = [out for out in output if out and is_whole_words(view_input, int(out[0]) - len(out[3]), int(out[0]))]
+        output = [prefix_helper_check_for_trie(view_input, out, address_type) for out in output]
+        processed_output = [process_trie_output(text.raw, address_type, out, last_output) for out in output]
+        processed_output = fuzz_pipeline_v2(processed_output)
+        if processed_output and processed_output[0]:
+            return processed_output[0]
+
+    return None
+
 def classify_trie_diacritics(
-    raw_input: str,
-    automaton: dict[str, dict[str, Any]],
+    raw_input: str | NormalizedText,
+    automaton: dict[str, Any],
     address_type: Literal["provinces", "districts", "wards"],
     last_output: tuple[str, tuple[int | str, str, str, str]] | None = None
 ) -> list[Any]:
+    if "diacritics" not in automaton:
+        return []
+
     _, last_address = last_output or (None, None)
-    normalized_input = to_normalized(raw_input)
-    diacritics_input = to_diacritics(normalized_input)
-    output = check_address(diacritics_input, automaton["diacritics"][address_type], last_address)
+    text = as_normalized_text(raw_input)
+    raw_input, diacritics_input = text.raw, text.diacritics
+    output = check_address(diacritics_input, automaton["diacritics"], address_type, last_address)
     processed_output = [process_trie_output(raw_input, address_type, out, last_output) for out in output]
     processed_output = fuzz_pipeline_v2(processed_output)
     if processed_output and processed_output[0]:
@@ -297,15 +350,16 @@ def bktree_spelling_check(input : str,
     return results
 
 def combine_diacritics_bktree(
-    input: str,
-    automaton: dict[str, dict[str, Any]],
+    input: str | NormalizedText,
+    automaton: dict[str, Any],
     bktree: dict[str, Any],
     prefix_dict: dict[str, list[str]],
     address_type: Literal["provinces", "districts", "wards"],
     last_output: tuple[str, tuple[int | str, str, str, str]] | None = None
 ):
-    output_trie_diacritics = classify_trie_diacritics(input, automaton, address_type, last_output)
-    output_spelling_check = bktree_spelling_check(input, bktree, prefix_dict, address_type, last_output)
+    text = as_normalized_text(input)
+    output_trie_diacritics = classify_trie_diacritics(text, automaton, address_type, last_output)
+    output_spelling_check = bktree_spelling_check(text.raw, bktree, prefix_dict, address_type, last_output)
 
     # Nếu cả hai đều rỗng
     if not output_trie_diacritics and not output_spelling_check:
@@ -364,26 +418,35 @@ def combine_diacritics_bktree(
    
 def full_pipeline(
     raw_input: str,
-    automaton: dict[str, dict[str, Any]],
-    bktree: dict[str, Any]
+    automaton: dict[str, Any],
+    bktree: dict[str, Any],
+    typo: Any = None
 ):
     parts = [p.strip() for p in raw_input.split(",")]
     
     can_province_none = False if parts[-1] else True
     can_district_none = True if len(parts) >= 3 and not parts[-2] and parts[-3] else False
     can_ward_none = True if len(parts) >= 3 and not parts[-3] and parts[-2] and parts[1] else False
+
+    # Cấp nào không được load trong index thì bỏ qua
+    can_province_none = can_province_none or "provinces" not in bktree
+    can_district_none = can_district_none or "districts" not in bktree
+    can_ward_none = can_ward_none or "wards" not in bktree
     
-    input = to_normalized(raw_input)
+    # mỗi chuỗi input của một cấp được chuẩn hóa một lần, dùng chung cho các bước
+    input = NormalizedText(to_normalized(raw_input), to_normalized)
 
     province = (
         classify_trie_normalized(input, automaton, "provinces") or 
+        classify_trie_typo(input, typo, "provinces") or
         # spelling_detect(input, bktree, "provinces")
         combine_diacritics_bktree(input, automaton, bktree, PREFIX_DICT, "provinces")
     ) if not can_province_none else None
-    province_input = province[0] if province else input
+    province_input = as_normalized_text(province[0]) if province else input
     
     district = (
         classify_trie_normalized(province_input, automaton, "districts", province) or 
+        classify_trie_typo(province_input, typo, "districts", province) or
         # spelling_detect(province_input, bktree, "districts", province)
         combine_diacritics_bktree(province_input, automaton,  bktree, PREFIX_DICT, "districts", province)
     ) if not can_district_none else None
@@ -395,6 +458,7 @@ def full_pipeline(
     ]):
         second_district = (
             classify_trie_normalized(input, automaton, "districts") or 
+            classify_trie_typo(input, typo, "districts") or
             combine_diacritics_bktree(input, automaton,  bktree, PREFIX_DICT, "districts")
         ) if not can_district_none else None
         
@@ -402,10 +466,11 @@ def full_pipeline(
             province = None
             district = second_district
             
-    district_input = district[0] if district else province_input
+    district_input = as_normalized_text(district[0]) if district else province_input
     
     ward = (
         classify_trie_normalized(district_input, automaton, "wards", district or province) or
+        classify_trie_typo(district_input, typo, "wards", district or province) or
         # spelling_detect(district_input, bktree, "wards", district or province)
         combine_diacritics_bktree(district_input, automaton, bktree, PREFIX_DICT, "wards", district or province)
     ) if not can_ward_none else None
@@ -418,6 +483,7 @@ def full_pipeline(
         second_district = None
         second_ward = (
             classify_trie_normalized(province_input, automaton, "wards", province) or
+            classify_trie_typo(province_input, typo, "wards", province) or
             # spelling_detect(province_input, bktree, "wards", province)
             combine_diacritics_bktree(province_input, automaton, bktree, PREFIX_DICT, "wards", province)
             
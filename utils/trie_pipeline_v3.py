@@ -17,11 +17,19 @@ PREFIX_DICT = {
     "wards" : ["phường", "xã", "thị trấn"]
 }
 
-def check_automaton(automaton, input: str):
+def check_automaton(
+    automaton,
+    input: str,
+    address_type: Literal["provinces", "districts", "wards"],
+    window_start: int = 0,
+    window_end: int | None = None
+):
+    from utils.trie import match_table
+
     res_dict: dict[str, list[tuple[str, str, str]]] = {}
     result = []
 
-    for end, (prefix, words, length) in automaton.iter(input):
+    for end, prefix, words, length in match_table(automaton, input, window_start, window_end).get(address_type, ()):
         for word in words:
             if word.isdigit():
                 if (end + 1) < len(input) and input[end + 1].isdigit():
@@ -45,14 +53,19 @@ def check_automaton(automaton, input: str):
 
 def check_address(
     processed_input: str,
-    automaton: dict[str, Any],
+    automaton: Any,
+    address_type: Literal["provinces", "districts", "wards"],
     last_address = None
 ):
-    address_dict = check_automaton(automaton, processed_input)
     comp = len(processed_input)
     if last_address:
         comp = int(last_address[0]) - len(last_address[3]) - 1
-        
+    if comp <= 0:
+        return [None]
+
+    # key kết thúc sau comp không bao giờ được nhận -> không cần quét phần sau comp
+    address_dict = check_automaton(automaton, processed_input, address_type, 0, min(comp, len(processed_input)))
+
     if address_dict:
         best_key = max((k for k in address_dict.keys() if int(k) <= comp), default=None)
         if best_key :
@@ -105,14 +118,14 @@ def process_trie_output(
 
 def classify_trie_normalized(
     raw_input: str,
-    automaton: dict[str, dict[str, Any]],
+    automaton: dict[str, Any],
     address_type: Literal["provinces", "districts", "wards"],
     last_output: tuple[str, tuple[int | str, str, str, str]] | None = None
 ):
     _, last_address = last_output or (None, None)
     normalized_input = to_normalized(raw_input)
 
-    output = check_address(normalized_input, automaton["normalized"][address_type], last_address)
+    output = check_address(normalized_input, automaton["normalized"], address_type, last_address)
     processed_output = [process_trie_output(raw_input, address_type, out, last_output) for out in output]
     processed_output = fuzz_pipeline_v2(processed_output)
     if processed_output and processed_output[0]:
@@ -122,14 +135,14 @@ def classify_trie_normalized(
 
 def classify_trie_diacritics(
     raw_input: str,
-    automaton: dict[str, dict[str, Any]],
+    automaton: dict[str, Any],
     address_type: Literal["provinces", "districts", "wards"],
     last_output: tuple[str, tuple[int | str, str, str, str]] | None = None
 ):
     _, last_address = last_output or (None, None)
     normalized_input = to_normalized(raw_input)
     diacritics_input = to_diacritics(normalized_input)
-    output = check_address(diacritics_input, automaton["diacritics"][address_type], last_address)
+    output = check_address(diacritics_input, automaton["diacritics"], address_type, last_address)
     processed_output = [process_trie_output(raw_input, address_type, out, last_output) for out in output]
     processed_output = fuzz_pipeline_v2(processed_output)
     if processed_output and processed_output[0]:
@@ -169,7 +182,7 @@ def bktree_spelling_check(input : str,
 
 def combine_diacritics_bktree(
     input: str,
-    automaton: dict[str, dict[str, Any]],
+    automaton: dict[str, Any],
     bktree : dict[str, Any],
     prefix_dict : dict[str, list[str]],
     address_type: Literal["provinces", "districts", "wards"],
@@ -190,7 +203,7 @@ def combine_diacritics_bktree(
     
 def full_pipeline(
     raw_input: str,
-    automaton: dict[str, dict[str, Any]],
+    automaton: dict[str, Any],
     bktree: dict[str, Any]
 ):
     parts = [p.strip() for p in raw_input.split(",")]
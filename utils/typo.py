@@ -0,0 +1,208 @@
+"""
+Edit-1 typo automaton.
+
+Holds every string one dropped, doubled or swapped letter away from a name
+("quang" -> "qung", "quanng", "qaung"), in the normalized view (names with
+diacritics) and the diacritic-free view, tagged with the edit type. Scanned
+like the exact automaton, so a name with one such typo is found in one
+linear pass instead of falling through to the BK-tree.
+
+Optional and off by default (AddressIndex(typo_levels=...)): the variants
+multiply the number of keys, so only names within the length caps are
+expanded. Run `python -m utils.typo` for the memory / hit rate of each level.
+"""
+
+from array import array
+
+from utils.preprocess import to_diacritics, to_normalized
+from utils.trie import AddressAutomaton
+
+EDITS = ("drop", "double", "swap")
+TYPO_VIEWS = ("normalized", "diacritics")
+
+
+def edit1_variants(key: str) -> dict[str, str]:
+    """
+    Strings one dropped, doubled or swapped letter away from key: {variant: edit type}.
+    Letters are only dropped from words of 3+ letters, shorter words become too ambiguous.
+    """
+    variants: dict[str, str] = {}
+    start = 0
+    for i, char in enumerate(key):
+        if char == " ":
+            start = i + 1
+            continue
+        end = key.find(" ", i)
+        if (len(key) if end < 0 else end) - start >= 3:
+            variants.setdefault(key[:i] + key[i + 1 :], "drop")
+        variants.setdefault(key[: i + 1] + char + key[i + 1 :], "double")
+        following = key[i + 1 : i + 2]
+        if following.strip() and following != char:
+            variants.setdefault(key[:i] + following + char + key[i + 2 :], "swap")
+    variants.pop(key, None)
+    return variants
+
+
+def build_typo_entries(
+    data: dict[str, list[str]],
+    levels: tuple[str, ...] | None = None,
+    views: tuple[str, ...] = TYPO_VIEWS,
+    min_length: int = 5,
+    max_length: int = 20,
+) -> tuple[dict[str, dict[str, dict[str, tuple[str, list[str]]]]], dict[str, str]]:
+    """
+    Edit-1 keys of the names of the given levels of data (all by default) with
+    min_length <= len(key) <= max_length: ({view: {key: {level: ("", words)}}},
+    {key: edit type}). Variants equal to the key of a name of any level are
+    skipped, the exact automaton already matches them.
+    """
+    forms = {
+        word: (to_normalized(word), to_diacritics(to_normalized(word)))
+        for words in data.values() for word in words if word
+    }
+    exact = {"normalized": {normalized for normalized, _ in forms.values()}, "diacritics": {diacritics for _, diacritics in forms.values()}}
+
+    entries: dict[str, dict[str, dict[str, tuple[str, list[str]]]]] = {view: {} for view in views}
+    edits: dict[str, str] = {}
+    for level, words in data.items():
+        if levels is not None and level not in levels:
+            continue
+        for word in words:
+            if not word:
+                continue
+            normalized, diacritics = forms[word]
+            keys = {"normalized": normalized, "diacritics": diacritics}
+            for view in views:
+                # tên không dấu đã nằm trong view diacritics
+                if view == "normalized" and normalized == diacritics:
+                    continue
+                key = keys[view]
+                if not min_length <= len(key) <= max_length:
+                    continue
+                for variant, edit in edit1_variants(key).items():
+                    if variant in exact[view]:
+                        continue
+                    records = entries[view].setdefault(variant, {})
+                    _, names = records.setdefault(level, ("", []))
+                    if word not in names:
+                        names.append(word)
+                    edits.setdefault(variant, edit)
+    return entries, edits
+
+
+class TypoAutomaton(AddressAutomaton):
+    """AddressAutomaton over edit-1 variants, entry_edit[entry] is the index in EDITS of its edit type"""
+    def __init__(self, view_entries: dict[str, dict[str, dict[str, tuple[str, list[str]]]]], edits: dict[str, str], levels: tuple[str, ...]):
+        super().__init__(view_entries, levels)
+        # cùng thứ tự entry với AddressAutomaton.__init__
+        keys = dict.fromkeys(key for view in self.views for key in view_entries[view])
+        self.entry_edit = array("B", (EDITS.index(edits[key]) for key in keys))
+
+    def edit(self, key: str) -> str | None:
+        """Edit type of a typo key, None if it is not one"""
+        value = self.automaton.get(key, None)
+        return None if value is None else EDITS[self.entry_edit[value >> 3]]
+
+
+def build_typo_automaton(
+    data: dict[str, list[str]],
+    levels: tuple[str, ...] | None = None,
+    views: tuple[str, ...] = TYPO_VIEWS,
+    min_length: int = 5,
+    max_length: int = 20,
+) -> TypoAutomaton:
+    """TypoAutomaton over the names of the given levels of data (all by default)"""
+    levels = tuple(data) if levels is None else tuple(level for level in data if level in levels)
+    entries, edits = build_typo_entries(data, levels, views, min_length, max_length)
+    return TypoAutomaton(entries, edits, levels)
+
+
+def typo_report(
+    levels: tuple[str, ...] = ("provinces", "districts", "wards"),
+    tests_path: str = "test/latest_test.json",
+    min_length: int = 5,
+    max_length: int = 20,
+) -> list[dict]:
+    """
+    Cost and effect of the typo automaton of each level on the test set:
+    keys, pickled size, build time; inputs whose level has no exact normalized
+    match in the whole input (fallthrough), how many the typo automaton resolves (hits, by edit type)
+    and rightly (correct); accuracy of that level in the full pipeline without / with it.
+    """
+    import contextlib
+    import io
+    import json
+    import pickle
+    import time
+
+    from utils.index import AddressIndex
+    from utils.input import preprocess_input
+    from utils.trie_pipeline_v2 import as_normalized_text, check_address, classify_trie_normalized, classify_trie_typo, to_normalized
+
+    with open(tests_path, "r", encoding="utf-8") as f:
+        tests = json.load(f)
+    fields = {"provinces": "province", "districts": "district", "wards": "ward"}
+    base = AddressIndex()
+    inputs = [preprocess_input(case["text"]) for case in tests]
+    with contextlib.redirect_stdout(io.StringIO()):
+        base_outputs = [base.process(case["text"]) for case in tests]
+
+    report = []
+    for level in levels:
+        start = time.perf_counter()
+        typo = build_typo_automaton(base.data, (level,), min_length=min_length, max_length=max_length)
+        seconds = time.perf_counter() - start
+        position = list(fields).index(level)
+        expected = [case["result"][fields[level]] for case in tests]
+
+        fallthrough, correct = 0, 0
+        hits = dict.fromkeys(EDITS, 0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for text, answer in zip(inputs, expected):
+                text = as_normalized_text(to_normalized(text))
+                if classify_trie_normalized(text, base.automaton, level):
+                    continue
+                fallthrough += 1
+                found = classify_trie_typo(text, typo, level)
+                if not found:
+                    continue
+                # key typo khớp được: detected_input của check_address trên view đầu tiên có kết quả
+                matches = (check_address(text.view(view), typo[view], level)[0] for view in typo.views)
+                hits[typo.edit(next(match for match in matches if match)[3])] += 1
+                correct += found[1][1] == answer
+
+            index = AddressIndex(typo_levels=(level,))
+            outputs = [index.process(case["text"]) for case in tests]
+
+        report.append({
+            "level": level,
+            "keys": len(typo.lengths),
+            "size_mb": len(pickle.dumps(typo)) / 2**20,
+            "build_s": seconds,
+            "fallthrough": fallthrough,
+            "hits": sum(hits.values()),
+            **{f"hits_{edit}": count for edit, count in hits.items()},
+            "correct": correct,
+            "accuracy_without": sum((output[position] or "") == answer for output, answer in zip(base_outputs, expected)) / len(tests),
+            "accuracy_with": sum((output[position] or "") == answer for output, answer in zip(outputs, expected)) / len(tests),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Memory and hit rate of the edit-1 typo automaton of each level")
+    parser.add_argument("levels", nargs="*", default=["provinces", "districts", "wards"])
+    parser.add_argument("--tests", default="test/latest_test.json")
+    parser.add_argument("--min-length", type=int, default=5)
+    parser.add_argument("--max-length", type=int, default=20)
+    args = parser.parse_args()
+
+    for row in typo_report(tuple(args.levels), args.tests, args.min_length, args.max_length):
+        print(
+            f"{row['level']:<10} {row['keys']:>8} keys {row['size_mb']:6.1f} MB {row['build_s']:6.2f} s | "
+            f"fallthrough {row['fallthrough']:>4} hits {row['hits']:>4} "
+            f"(drop {row['hits_drop']}, double {row['hits_double']}, swap {row['hits_swap']}) correct {row['correct']:>4} | "
+            f"accuracy {row['accuracy_without']:.3f} -> {row['accuracy_with']:.3f}"
+        )